@@ -0,0 +1,109 @@
+"""
+Parse/dump benchmark: stdlib json (as the stores used it) vs the msgspec
+codecs in server/utils/codecs.py, on large synthetic conversation
+histories and user sets.
+
+Usage:
+    python benchmarks/bench_codecs.py [--messages 20000] [--users 20000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.utils import codecs
+
+
+def make_document(message_count):
+    conversations = []
+    for c in range(5):
+        messages = []
+        for i in range(message_count // 5):
+            sender = 'user' if i % 2 == 0 else 'bot'
+            messages.append({
+                'id': f'{sender}-{i}-1749256457',
+                'content': 'Das ist eine wunderbare Wahl! Spielst du auch ein Instrument? ' * 2,
+                'sender': sender,
+                'timestamp': '2025-06-07T00:35:16.467920',
+                'intent': 'chat',
+                'audio_language': 'German'
+            })
+        conversations.append({
+            'id': f'conversation-{c}',
+            'user_id': 'bench-user',
+            'created_at': '2025-06-07T00:34:17.443970',
+            'summary': '- Likes music\n- Plays the oboe',
+            'messages': messages
+        })
+    return {'user_id': 'bench-user', 'conversations': conversations, 'current_conversation_id': 'conversation-4'}
+
+
+def make_users(user_count):
+    return {
+        f'user-{i}': {
+            'id': f'user-{i}',
+            'username': f'learner{i}',
+            'email': f'learner{i}@example.com',
+            'password_hash': '$2b$12$' + 'x' * 53,
+            'nativeLanguage': 'English',
+            'learningLanguage': 'Spanish',
+            'created_at': '2025-06-07T00:34:17.443970',
+            'personalization': {'currentLocation': 'Madrid', 'workStudy': 'Engineer'}
+        }
+        for i in range(user_count)
+    }
+
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def report(label, baseline, candidate):
+    print(f"  {label:28s} json {baseline * 1000:9.2f} ms   msgspec {candidate * 1000:9.2f} ms   x{baseline / candidate:5.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    document = make_document(args.messages)
+    legacy_text = json.dumps(document, indent=2, ensure_ascii=False)
+    legacy_bytes = legacy_text.encode('utf-8')
+    log_bytes = b''.join(codecs.encode_log_records(conv['id'], conv['messages']) for conv in document['conversations'])
+    log_lines = log_bytes.decode('utf-8').splitlines()
+
+    print(f"Conversation document: {args.messages} messages, {len(legacy_bytes) / 1e6:.1f} MB indented")
+    report('parse whole document', best_of(args.repeat, lambda: json.loads(legacy_text)),
+           best_of(args.repeat, lambda: codecs.decode_document(legacy_bytes)))
+    report('dump whole document', best_of(args.repeat, lambda: json.dumps(document, indent=2, ensure_ascii=False)),
+           best_of(args.repeat, lambda: codecs.encode_document(document)))
+    report('parse JSONL message log', best_of(args.repeat, lambda: [json.loads(line) for line in log_lines]),
+           best_of(args.repeat, lambda: codecs.decode_log(log_bytes)))
+    report('dump JSONL message log', best_of(args.repeat, lambda: ''.join(
+        json.dumps({'conversation_id': conv['id'], 'message': msg}, ensure_ascii=False) + '\n'
+        for conv in document['conversations'] for msg in conv['messages'])),
+           best_of(args.repeat, lambda: [codecs.encode_log_records(conv['id'], conv['messages']) for conv in document['conversations']]))
+
+    users = make_users(args.users)
+    users_text = json.dumps(users, indent=2, ensure_ascii=False)
+    users_bytes = users_text.encode('utf-8')
+    print(f"Users snapshot: {args.users} users, {len(users_bytes) / 1e6:.1f} MB indented")
+    report('parse users.json', best_of(args.repeat, lambda: json.loads(users_text)),
+           best_of(args.repeat, lambda: codecs.decode_users(users_bytes)))
+    report('dump users.json', best_of(args.repeat, lambda: json.dumps(users, indent=2, ensure_ascii=False)),
+           best_of(args.repeat, lambda: codecs.encode_users(users)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Contention benchmark for the per-user conversation write path.
+
+Runs many concurrent users, each with several threads appending messages
+through ConversationService.add_message, once with a single lock stripe
+(equivalent to the old process-global lock) and once with the default
+striped locks. Verifies that no user loses a message.
+
+Each pair of runs is repeated with --io-ms of extra storage latency per
+write, added inside the critical section (the fsync or network-disk wait
+of a real deployment). Without it the write path is CPU-bound under the
+GIL: stripes cannot run in parallel, and the single lock is about as
+fast or slightly faster, since fewer threads are runnable at once. With
+it, a single lock makes every user wait on every other user's I/O, while
+striped locks overlap the waits of different users.
+
+Usage:
+    python benchmarks/bench_lock_contention.py [--users 50] [--threads 4] [--messages 20] [--io-ms 2]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from server.utils import conversation_utils, lock_utils
+from server.utils.conversation_utils import load_user_conversations
+from server.services.conversation_service import ConversationService
+
+
+def run(app, users, threads_per_user, messages_per_thread):
+    service = ConversationService()
+    start_barrier = threading.Barrier(users * threads_per_user)
+
+    def worker(user_id, thread_index):
+        start_barrier.wait()
+        with app.app_context():
+            for i in range(messages_per_thread):
+                service.add_message(user_id, f'message {thread_index}-{i}', 'user', 'chat', 'English')
+
+    workers = [
+        threading.Thread(target=worker, args=(f'bench-user-{u}', t))
+        for u in range(users)
+        for t in range(threads_per_user)
+    ]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    expected = threads_per_user * messages_per_thread
+    lost = 0
+    with app.app_context():
+        for u in range(users):
+            conversations = load_user_conversations(f'bench-user-{u}')
+            stored = sum(len(conv['messages']) for conv in conversations['conversations'])
+            lost += expected - stored
+    return elapsed, lost
+
+
+def with_io_latency(write, io_ms):
+    """write with io_ms of blocking wait first, inside the caller's lock"""
+    def slow_write(user_id, conversations_data):
+        time.sleep(io_ms / 1000.0)
+        return write(user_id, conversations_data)
+    return slow_write
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--io-ms', type=float, default=2.0,
+                        help='storage latency added to each write in the second round')
+    args = parser.parse_args()
+
+    total = args.users * args.threads * args.messages
+    print(f"{args.users} users x {args.threads} threads x {args.messages} messages = {total} writes")
+
+    write = conversation_utils._write_conversations
+    for io_ms in (0, args.io_ms):
+        conversation_utils._write_conversations = with_io_latency(write, io_ms) if io_ms else write
+        print(f"storage latency {io_ms:g} ms per write")
+        for label, stripes in (('single lock', 1), ('striped', lock_utils.DEFAULT_STRIPES)):
+            lock_utils.user_locks = lock_utils.StripedLock(stripes)
+            app = Flask(__name__)
+            app.config['DATA_DIR'] = tempfile.mkdtemp(prefix='bench-locks-')
+            elapsed, lost = run(app, args.users, args.threads, args.messages)
+            print(f"  {label:12s} {elapsed:7.3f}s  {total / elapsed:9.1f} writes/s  lost messages: {lost}")
+            if lost:
+                sys.exit(1)
+    conversation_utils._write_conversations = write
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+SSML build benchmark: the five str.replace passes _add_speech_marks used
+(one pause dict copy per call) vs the single translate pass in
+server/utils/ssml_utils.py, on typical bot replies.
+
+Usage:
+    python benchmarks/bench_ssml.py [--calls 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server.language_config import get_pause_durations
+from server.utils.ssml_utils import build_ssml
+
+REPLIES = [
+    'Hallo Anna! Wie geht es dir heute?',
+    'Das ist eine wunderbare Wahl! Spielst du auch ein Instrument? Ich höre gern Jazz, aber auch Klassik; was magst du am liebsten?',
+    'Sehr gut. Erzähl mir mehr über deine Arbeit, deine Kollegen und was du am Wochenende machst.',
+    '你好！你今天过得怎么样？我们聊聊你的爱好吧。'
+]
+
+
+def replace_passes(text, speed_rate=1.0, voice_name="en-US-AriaNeural"):
+    """_add_speech_marks as it was before ssml_utils"""
+    prosody_rate = f"{speed_rate:.1f}"
+    pauses = get_pause_durations()
+    pause_multiplier = 1.0 / speed_rate
+
+    sentence_pause = int(pauses['sentence'] * pause_multiplier)
+    comma_pause = int(pauses['comma'] * pause_multiplier)
+    semicolon_pause = int(pauses['semicolon'] * pause_multiplier)
+
+    text = text.replace('.', f'.<break time="{sentence_pause}ms"/>')
+    text = text.replace(',', f',<break time="{comma_pause}ms"/>')
+    text = text.replace('!', f'!<break time="{sentence_pause}ms"/>')
+    text = text.replace('?', f'?<break time="{sentence_pause}ms"/>')
+    text = text.replace(';', f';<break time="{semicolon_pause}ms"/>')
+
+    return f'''<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">
+            <voice name="{voice_name}">
+                <prosody rate="{prosody_rate}">
+                    {text}
+                </prosody>
+            </voice>
+        </speak>'''
+
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    speeds = (0.5, 0.8, 1.0, 1.2)
+    workload = [
+        (REPLIES[i % len(REPLIES)], speeds[i % len(speeds)])
+        for i in range(args.calls)
+    ]
+
+    def run_baseline():
+        for text, speed in workload:
+            replace_passes(text, speed, 'de-DE-ConradNeural')
+
+    def run_candidate():
+        for text, speed in workload:
+            build_ssml(text, 'de-DE-ConradNeural', speed)
+
+    baseline = best_of(args.repeat, run_baseline)
+    candidate = best_of(args.repeat, run_candidate)
+    print(f"{args.calls} SSML builds (best of {args.repeat})")
+    print(f"  replace passes {baseline * 1000:9.2f} ms   {baseline / args.calls * 1e6:6.2f} us/call")
+    print(f"  ssml_utils     {candidate * 1000:9.2f} ms   {candidate / args.calls * 1e6:6.2f} us/call   x{baseline / candidate:5.1f}")
+
+
+if __name__ == '__main__':
+    main()
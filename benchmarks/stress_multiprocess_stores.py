@@ -0,0 +1,158 @@
+"""
+Multi-process stress test for the JSON stores.
+
+Several worker processes hammer the same users file (journal mode with a
+low compaction threshold) and the same conversation files at once, as
+they would under a multi-worker server. Afterwards the files are checked
+for integrity: every record parses, no user or field update is lost and
+every message of a shared conversation is present exactly once.
+
+Usage:
+    python benchmarks/stress_multiprocess_stores.py [--processes 6] [--operations 100]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+
+def make_app(data_dir):
+    app = Flask(__name__)
+    app.config.update(
+        DATA_DIR=data_dir,
+        USERS_FILE=os.path.join(data_dir, 'users.json'),
+        USERS_JOURNAL_ENABLED=True,
+        USERS_JOURNAL_COMPACT_THRESHOLD=50,
+        CONVERSATION_CACHE_MAX_BYTES=1024 * 1024,
+        CONVERSATION_WRITE_MODE='write_through'
+    )
+    return app
+
+
+def make_user(user_id):
+    return {
+        'id': user_id,
+        'username': user_id,
+        'email': f'{user_id}@example.com',
+        'password_hash': 'x',
+        'nativeLanguage': 'English',
+        'learningLanguage': 'Spanish',
+        'created_at': '2025-01-01T00:00:00',
+        'personalization': {}
+    }
+
+
+def worker(data_dir, process_index, operations):
+    from server.utils.file_utils import add_user, update_user
+    from server.services.conversation_service import ConversationService
+
+    app = make_app(data_dir)
+    service = ConversationService()
+    with app.app_context():
+        for i in range(operations):
+            user_id = f'p{process_index}-u{i}'
+            add_user(user_id, make_user(user_id))
+            # Every process writes its own field on the same user
+            update_user('shared-user', {f'p{process_index}': i})
+            service.add_message('shared-user', f'p{process_index}-m{i}', 'user', 'chat', 'English')
+
+
+def verify(data_dir, processes, operations):
+    from server.utils.file_utils import UserRepository
+    from server.utils.conversation_utils import (
+        load_user_conversations, get_user_conversation_log_file, get_user_conversation_header_file
+    )
+
+    errors = []
+    users_file = os.path.join(data_dir, 'users.json')
+
+    journal_file = f'{users_file}.journal'
+    if os.path.exists(journal_file):
+        with open(journal_file, 'rb') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    json.loads(line)
+                except json.JSONDecodeError:
+                    errors.append(f'users journal line {line_number} is corrupt')
+
+    repository = UserRepository(users_file, journal=True)
+    users = repository.all()
+    expected_users = processes * operations + 1
+    if len(users) != expected_users:
+        errors.append(f'expected {expected_users} users, found {len(users)}')
+    shared = users.get('shared-user', {})
+    for p in range(processes):
+        if shared.get(f'p{p}') != operations - 1:
+            errors.append(f'shared user field p{p} is {shared.get(f"p{p}")!r}, expected {operations - 1}')
+
+    app = make_app(data_dir)
+    with app.app_context():
+        with open(get_user_conversation_log_file('shared-user'), 'rb') as f:
+            log_lines = f.read().splitlines()
+        for line_number, line in enumerate(log_lines, 1):
+            try:
+                json.loads(line)
+            except json.JSONDecodeError:
+                errors.append(f'conversation log line {line_number} is corrupt')
+        with open(get_user_conversation_header_file('shared-user'), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+
+        conversations = load_user_conversations('shared-user')
+        contents = [msg['content'] for conv in conversations['conversations'] for msg in conv['messages']]
+        expected = {f'p{p}-m{i}' for p in range(processes) for i in range(operations)}
+        if len(contents) != len(set(contents)):
+            errors.append('duplicate messages in shared conversation')
+        missing = expected - set(contents)
+        if missing:
+            errors.append(f'{len(missing)} messages missing from shared conversation')
+        if sum(header['message_counts'].values()) != len(log_lines):
+            errors.append('conversation header counts do not match the log')
+
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=6)
+    parser.add_argument('--operations', type=int, default=100)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='stress-stores-')
+    app = make_app(data_dir)
+    with app.app_context():
+        from server.utils.file_utils import add_user
+        add_user('shared-user', make_user('shared-user'))
+
+    started = time.perf_counter()
+    workers = [
+        multiprocessing.Process(target=worker, args=(data_dir, p, args.operations))
+        for p in range(args.processes)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    if any(process.exitcode != 0 for process in workers):
+        print('a worker process failed')
+        sys.exit(1)
+
+    errors = verify(data_dir, args.processes, args.operations)
+    print(f"{args.processes} processes x {args.operations} operations in {elapsed:.2f}s ({data_dir})")
+    for error in errors:
+        print(f"FAIL: {error}")
+    if errors:
+        sys.exit(1)
+    print("OK: all files intact, no lost writes")
+
+
+if __name__ == '__main__':
+    main()
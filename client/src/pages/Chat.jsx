@@ -11,10 +11,12 @@ function Chat() {
   const [historyLoaded, setHistoryLoaded] = useState(false)
   const [audioSpeed, setAudioSpeed] = useState(0.8) // Default 80% speed
   const [playingAudioId, setPlayingAudioId] = useState(null)
+  const [streamingId, setStreamingId] = useState(null) // Bot reply still arriving
   
   const { user } = useAuth()
   const audioRefs = useRef({}) // Store audio elements by message ID
   const currentAudioRef = useRef(null) // Track currently playing audio
+  const sentenceQueueRef = useRef([]) // Sentence audio of the streamed reply, in order
 
   // Load chat history when component mounts
   useEffect(() => {
@@ -71,7 +73,7 @@ function Chat() {
     
     // Generate audio for greeting
     try {
-      const audioResponse = await api.regenerateAudio(
+      const audioResponse = await api.generateAudio(
         greetingMessage,
         user.learningLanguage,
         audioSpeed
@@ -84,13 +86,14 @@ function Chat() {
         timestamp: new Date().toISOString(),
         intent: 'chat',
         audio_language: user.learningLanguage,
-        audio_data: audioResponse.audio_data
+        audio_id: audioResponse.audio_id,
+        local: true // Not stored on the server
       }
       
       setMessages([botMessage])
       
       // Play the greeting audio automatically
-      setTimeout(() => playAudio(botMessage.id, audioResponse.audio_data), 100)
+      setTimeout(() => playAudio(botMessage.id, audioResponse.audio_id), 100)
       
     } catch (err) {
       // If audio fails, still show the message
@@ -100,25 +103,28 @@ function Chat() {
         sender: 'bot',
         timestamp: new Date().toISOString(),
         intent: 'chat',
-        audio_language: user.learningLanguage
+        audio_language: user.learningLanguage,
+        local: true
       }
       setMessages([botMessage])
     }
   }
 
-  const playAudio = (messageId, audioData) => {
+  const playAudio = (messageId, audioId) => {
     // Stop any currently playing audio
+    sentenceQueueRef.current = []
     if (currentAudioRef.current) {
       currentAudioRef.current.pause()
       setPlayingAudioId(null)
     }
 
-    if (!audioData) return
+    if (!audioId) return
 
     try {
-      // Create audio element if it doesn't exist
+      // Create audio element if it doesn't exist; it streams from the
+      // server and starts playing before the whole clip has arrived
       if (!audioRefs.current[messageId]) {
-        const audio = new Audio(`data:audio/mp3;base64,${audioData}`)
+        const audio = new Audio(api.audioUrl(audioId))
         audioRefs.current[messageId] = audio
         
         // Set up event listeners
@@ -148,7 +154,39 @@ function Chat() {
     }
   }
 
+  // Plays the streamed reply's sentences back to back as they arrive
+  const playNextSentence = () => {
+    const audioId = sentenceQueueRef.current.shift()
+    if (!audioId) {
+      // Caught up with synthesis; the next sentence restarts playback
+      currentAudioRef.current = null
+      return
+    }
+
+    const audio = new Audio(api.audioUrl(audioId))
+    currentAudioRef.current = audio
+    audio.addEventListener('ended', playNextSentence)
+    audio.addEventListener('error', (e) => {
+      console.error('Audio playback error:', e)
+      playNextSentence()
+    })
+    audio.play().catch(err => {
+      console.error('Failed to play audio:', err)
+      sentenceQueueRef.current = []
+      currentAudioRef.current = null
+    })
+  }
+
+  const queueSentenceAudio = (audioId) => {
+    if (!audioId) return // This sentence failed to synthesize
+    sentenceQueueRef.current.push(audioId)
+    if (!currentAudioRef.current) {
+      playNextSentence()
+    }
+  }
+
   const stopAudio = () => {
+    sentenceQueueRef.current = []
     if (currentAudioRef.current) {
       currentAudioRef.current.pause()
       currentAudioRef.current.currentTime = 0
@@ -157,20 +195,22 @@ function Chat() {
     }
   }
 
+  // Stored messages are regenerated by id; the local greeting by its text
+  const requestAudio = (message, speed) =>
+    message.local
+      ? api.generateAudio(message.content, message.audio_language, speed)
+      : api.regenerateAudio(message.id, speed)
+
   const regenerateAudioWithNewSpeed = async (message) => {
 
     try {
-      const response = await api.regenerateAudio(
-        message.content,
-        message.audio_language,
-        audioSpeed
-      )
+      const response = await requestAudio(message, audioSpeed)
 
-      if (response.audio_data) {
+      if (response.audio_id) {
         // Update message with new audio
         setMessages(prev => prev.map(msg => 
           msg.id === message.id 
-            ? { ...msg, audio_data: response.audio_data }
+            ? { ...msg, audio_id: response.audio_id }
             : msg
         ))
         
@@ -180,7 +220,7 @@ function Chat() {
         }
         
         // Play new audio
-        playAudio(message.id, response.audio_data)
+        playAudio(message.id, response.audio_id)
       }
     } catch (err) {
       console.error('Failed to regenerate audio:', err)
@@ -195,26 +235,25 @@ function Chat() {
     
     // Directly regenerate the last bot message audio
     const lastBotMessage = messages
-      .filter(msg => msg.sender === 'bot' && msg.audio_data)
+      .filter(msg => msg.sender === 'bot' && msg.audio_id)
       .pop()
     
     if (lastBotMessage) {
       console.log('[DEBUG] Found message to regenerate:', lastBotMessage.id)
       
       try {
-        const response = await api.regenerateAudio(
-          lastBotMessage.content,
-          lastBotMessage.audio_language,
+        const response = await requestAudio(
+          lastBotMessage,
           newSpeed  // Use newSpeed directly, not audioSpeed state
         )
         
         console.log('[DEBUG] Got new audio response')
         
-        if (response.audio_data) {
+        if (response.audio_id) {
           // Update the message with new audio
           setMessages(prev => prev.map(msg => 
             msg.id === lastBotMessage.id 
-              ? { ...msg, audio_data: response.audio_data }
+              ? { ...msg, audio_id: response.audio_id }
               : msg
           ))
           
@@ -226,7 +265,7 @@ function Chat() {
           // Stop current playback and play new audio
           stopAudio()
           setTimeout(() => {
-            playAudio(lastBotMessage.id, response.audio_data)
+            playAudio(lastBotMessage.id, response.audio_id)
           }, 100)
         }
       } catch (err) {
@@ -252,27 +291,62 @@ function Chat() {
       timestamp: new Date().toISOString()
     }
     setMessages(prev => [...prev, newUserMessage])
+    stopAudio()
+
+    // The reply is shown and spoken as it is generated
+    const streamId = `streaming-${Date.now()}`
+    let streamed = false
+    const appendToken = (text) => {
+      streamed = true
+      setStreamingId(streamId)
+      setMessages(prev => prev.some(msg => msg.id === streamId)
+        ? prev.map(msg => msg.id === streamId ? { ...msg, content: msg.content + text } : msg)
+        : [...prev, {
+            id: streamId,
+            content: text,
+            sender: 'bot',
+            timestamp: new Date().toISOString(),
+            local: true
+          }]
+      )
+    }
+    const appendAudio = (chunk) => {
+      streamed = true
+      queueSentenceAudio(chunk.audio_id)
+    }
 
     try {
-      // Send message to backend with audio speed preference
-      const response = await api.sendChatMessage(userMessage, audioSpeed)
+      let response
+      try {
+        response = await api.streamChatMessage(userMessage, audioSpeed, appendToken, appendAudio)
+      } catch (err) {
+        // Nothing arrived: fall back to the plain request
+        if (streamed) throw err
+        console.warn('Streaming unavailable, sending without it:', err)
+        response = await api.sendChatMessage(userMessage, audioSpeed)
+      }
+      if (!response) {
+        throw new Error('The reply stream ended early')
+      }
       
-      // Add bot response to UI
+      // Replace the streamed text with the stored reply
       const botMessage = {
-        id: Date.now() + 1,
+        id: response.message_id || Date.now() + 1,
         content: response.response,
         sender: 'bot',
         timestamp: new Date().toISOString(),
         intent: response.intent,
         audio_language: response.audio_language,
-        audio_data: response.audio_data
+        audio_id: response.audio_id,
+        local: !response.message_id
       }
       
-      setMessages(prev => [...prev, botMessage])
+      setMessages(prev => [...prev.filter(msg => msg.id !== streamId), botMessage])
       
-      // Auto-play audio for new bot message
-      if (response.audio_data) {
-        setTimeout(() => playAudio(botMessage.id, response.audio_data), 100)
+      // Auto-play audio for new bot message (streamed replies were
+      // already spoken sentence by sentence)
+      if (response.audio_id) {
+        setTimeout(() => playAudio(botMessage.id, response.audio_id), 100)
       }
       
     } catch (err) {
@@ -280,8 +354,9 @@ function Chat() {
       console.error('Chat error:', err)
       
       // Remove the user message if sending failed
-      setMessages(prev => prev.filter(msg => msg.id !== newUserMessage.id))
+      setMessages(prev => prev.filter(msg => msg.id !== newUserMessage.id && msg.id !== streamId))
     } finally {
+      setStreamingId(null)
       setLoading(false)
     }
   }
@@ -354,14 +429,14 @@ function Chat() {
           <div key={message.id} className={`message ${message.sender}`}>
             <div className="message-bubble">
               {message.content}
-              {message.sender === 'bot' && message.audio_data && (
+              {message.sender === 'bot' && message.audio_id && (
                 <button
                   className={`audio-btn ${playingAudioId === message.id ? 'playing' : ''}`}
                   onClick={() => {
                     if (playingAudioId === message.id) {
                       stopAudio()
                     } else {
-                      playAudio(message.id, message.audio_data)
+                      playAudio(message.id, message.audio_id)
                     }
                   }}
                   title={playingAudioId === message.id ? 'Stop' : 'Play audio'}
@@ -369,7 +444,7 @@ function Chat() {
                   {playingAudioId === message.id ? '⏸️' : '🔊'}
                 </button>
               )}
-              {message.sender === 'bot' && !message.audio_data && (
+              {message.sender === 'bot' && !message.audio_id && message.id !== streamingId && (
                 <button
                   className="audio-btn regenerate"
                   onClick={() => regenerateAudioWithNewSpeed(message)}
@@ -382,7 +457,7 @@ function Chat() {
           </div>
         ))}
         
-        {loading && (
+        {loading && !streamingId && (
           <div className="message bot">
             <div className="message-bubble typing">
               Thinking...
@@ -2,11 +2,39 @@ const API_BASE = 'http://localhost:5000/api'
 
 const getToken = () => localStorage.getItem('token')
 
+// Browsers that can play WebM/Opus say so, so the server may send the
+// smaller Opus audio on slow connections (MP3 otherwise)
+const canPlayOpus = typeof Audio !== 'undefined' &&
+  new Audio().canPlayType('audio/webm; codecs="opus"') !== ''
+const AUDIO_ACCEPT = canPlayOpus ? ', audio/webm;q=0.9' : ''
+
+// Client hints (Save-Data, ECT, Downlink) only reach a same-origin server
+// over HTTPS, so the client picks the audio format from the Network
+// Information API itself, by the same thresholds the server uses
+// (server/utils/audio_formats.py). Read per request: the link can change.
+const VERY_SLOW_DOWNLINK = 0.5
+const SLOW_DOWNLINK = 2.0
+
+const audioFormat = () => {
+  const connection = typeof navigator !== 'undefined' && navigator.connection
+  if (!canPlayOpus || !connection) return undefined
+
+  const { saveData, effectiveType, downlink } = connection
+  if (saveData || effectiveType === 'slow-2g' || effectiveType === '2g' || downlink < VERY_SLOW_DOWNLINK) {
+    return 'webm-opus-low'
+  }
+  if (effectiveType === '3g' || downlink < SLOW_DOWNLINK) {
+    return 'webm-opus'
+  }
+  return 'mp3'
+}
+
 const request = async (endpoint, options = {}) => {
   const token = getToken()
   const config = {
     headers: {
       'Content-Type': 'application/json',
+      'Accept': `application/json${AUDIO_ACCEPT}`,
       ...(token && { 'Authorization': `Bearer ${token}` })
     },
     ...options
@@ -51,9 +79,59 @@ export const api = {
   sendChatMessage: (message, audioSpeed = 0.8) =>
     request('/chat/message', {
       method: 'POST',
-      body: JSON.stringify({ message, audio_speed: audioSpeed })
+      body: JSON.stringify({ message, audio_speed: audioSpeed, audio_format: audioFormat() })
     }),
 
+  // Streams the reply as Server-Sent Events: onToken gets each text delta,
+  // onAudio each sentence's audio ({ index, text, audio_id }) in order,
+  // the promise resolves with the final payload (same shape as sendChatMessage)
+  streamChatMessage: async (message, audioSpeed = 0.8, onToken = () => {}, onAudio = () => {}) => {
+    const token = getToken()
+    const response = await fetch(`${API_BASE}/chat/message/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': `text/event-stream${AUDIO_ACCEPT}`,
+        ...(token && { 'Authorization': `Bearer ${token}` })
+      },
+      body: JSON.stringify({ message, audio_speed: audioSpeed, audio_format: audioFormat() })
+    })
+
+    if (!response.ok) {
+      const data = await response.json()
+      throw new Error(data.message || data.error || 'Something went wrong')
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let result = null
+
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      let boundary
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+
+        const event = frame.match(/^event: (.*)$/m)?.[1]
+        const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] || 'null')
+        if (event === 'token') {
+          onToken(data.text)
+        } else if (event === 'audio') {
+          onAudio(data)
+        } else if (event === 'done' || event === 'error') {
+          result = data
+        }
+      }
+    }
+
+    return result
+  },
+
   getChatHistory: () => request('/chat/history'),
 
   startNewChatSession: () =>
@@ -61,9 +139,20 @@ export const api = {
       method: 'POST'
     }),
 
-  regenerateAudio: (text, language, audioSpeed = 0.8) =>
+  // Audio for a stored message at a new speed
+  regenerateAudio: (messageId, audioSpeed = 0.8) =>
     request('/chat/regenerate-audio', {
       method: 'POST',
-      body: JSON.stringify({ text, language, audio_speed: audioSpeed })
-    })
+      body: JSON.stringify({ message_id: messageId, audio_speed: audioSpeed, audio_format: audioFormat() })
+    }),
+
+  // Audio for text that is not a stored message (e.g. the greeting)
+  generateAudio: (text, language, audioSpeed = 0.8) =>
+    request('/chat/regenerate-audio', {
+      method: 'POST',
+      body: JSON.stringify({ text, language, audio_speed: audioSpeed, audio_format: audioFormat() })
+    }),
+
+  // Streamable URL of a rendered clip
+  audioUrl: (audioId) => `${API_BASE}/chat/audio/${audioId}`
 }
\ No newline at end of file
@@ -2,6 +2,10 @@ from flask import Flask
 from flask_cors import CORS
 from .config import Config
 from .database import db_connection, initialize_graph  # Add initialize_graph
+from .utils.conversation_utils import flush_conversation_cache
+from .services.conversation_service import close_summary_queue, get_summary_queue_stats
+from .utils.audio_cache import get_audio_cache_stats
+from .services.synthesizer_pool import close_synthesizer_pool, get_synthesizer_pool_stats
 import atexit
 import logging
 
@@ -31,7 +35,13 @@ def create_app():
         
     
     # Register cleanup function
-    atexit.register(lambda: db_connection.close())
+    def shutdown():
+        close_summary_queue()
+        flush_conversation_cache()
+        close_synthesizer_pool()
+        db_connection.close()
+    
+    atexit.register(shutdown)
     
     # Register blueprints with URL prefixes
     from .routes.auth import auth_bp
@@ -42,9 +52,20 @@ def create_app():
     app.register_blueprint(user_bp, url_prefix='/api/user')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     
+    # Render canned error/placeholder audio once, off the startup path
+    if app.config.get('AUDIO_WARMUP_ENABLED') and app.config.get('AZURE_SPEECH_KEY'):
+        from .routes.chat import chat_service
+        chat_service.start_audio_warmup(app)
+    
     # Health check endpoint
     @app.route('/api/health')
     def health_check():
-        return {'status': 'healthy', 'message': 'Language Exchange API is running'}
+        return {
+            'status': 'healthy',
+            'message': 'Language Exchange API is running',
+            'summary_queue': get_summary_queue_stats(),
+            'audio_cache': get_audio_cache_stats(),
+            'synthesizer_pool': get_synthesizer_pool_stats()
+        }
     
     return app
\ No newline at end of file
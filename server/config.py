@@ -31,14 +31,71 @@ class Config:
     DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
     USERS_FILE = os.path.join(DATA_DIR, 'users.json')
     
+    # Append user mutations to users.json.journal instead of rewriting users.json
+    USERS_JOURNAL_ENABLED = os.environ.get('USERS_JOURNAL_ENABLED', 'true').lower() == 'true'
+    # Fold the journal into a new users.json snapshot after this many records
+    USERS_JOURNAL_COMPACT_THRESHOLD = int(os.environ.get('USERS_JOURNAL_COMPACT_THRESHOLD', 1000))
+    
+    # In-memory LRU of parsed conversation documents (0 disables it)
+    CONVERSATION_CACHE_MAX_BYTES = int(os.environ.get('CONVERSATION_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # 'write_through' saves every turn immediately; 'write_behind' batches
+    # saves every CONVERSATION_FLUSH_INTERVAL_MS and may lose that window on
+    # a crash (single-process deployments only)
+    CONVERSATION_WRITE_MODE = os.environ.get('CONVERSATION_WRITE_MODE', 'write_through')
+    CONVERSATION_FLUSH_INTERVAL_MS = int(os.environ.get('CONVERSATION_FLUSH_INTERVAL_MS', 1000))
+    
     # OpenAI configuration (for future chat functionality)
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    CHAT_MODEL = os.environ.get('CHAT_MODEL', 'gpt-4')
+    # Prompt token budget for chat turns (0 = the model's default budget)
+    CHAT_PROMPT_TOKEN_BUDGET = int(os.environ.get('CHAT_PROMPT_TOKEN_BUDGET', 0))
+    # Also treat messages written in the native script as teaching requests
+    INTENT_SCRIPT_CHECK = os.environ.get('INTENT_SCRIPT_CHECK', 'true').lower() == 'true'
+    
+    # Background conversation summarization
+    SUMMARY_WORKERS = int(os.environ.get('SUMMARY_WORKERS', 2))
+    SUMMARY_MAX_RETRIES = int(os.environ.get('SUMMARY_MAX_RETRIES', 3))
+    SUMMARY_RETRY_BACKOFF_MS = int(os.environ.get('SUMMARY_RETRY_BACKOFF_MS', 1000))
     
     # Azure configuration (for future deployment)
     AZURE_API_KEY = os.environ.get('AZURE_API_KEY')
     AZURE_ENDPOINT = os.environ.get('AZURE_ENDPOINT')
     AZURE_SPEECH_KEY = os.environ.get('AZURE_SPEECH_KEY')
     AZURE_SPEECH_REGION = os.environ.get('AZURE_SPEECH_REGION')
+    # Shared in-memory LRU of rendered audio, bounded in bytes
+    AUDIO_CACHE_MAX_BYTES = int(os.environ.get('AUDIO_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    # Content-addressed renders on disk (DATA_DIR/audio/store), shared by
+    # all workers and kept across restarts; oldest evicted beyond this size
+    AUDIO_STORE_MAX_BYTES = int(os.environ.get('AUDIO_STORE_MAX_BYTES', 1024 * 1024 * 1024))
+    # Pre-render the fixed error/placeholder replies at startup, per
+    # language at these playback speeds (stored under DATA_DIR/audio/canned)
+    AUDIO_WARMUP_ENABLED = os.environ.get('AUDIO_WARMUP_ENABLED', 'true').lower() == 'true'
+    AUDIO_WARMUP_SPEEDS = tuple(
+        float(speed) for speed in os.environ.get('AUDIO_WARMUP_SPEEDS', '0.5,0.6,0.7,0.8,0.9,1.0,1.2').split(',')
+    )
+    # Worker threads synthesizing streamed replies sentence by sentence
+    TTS_PIPELINE_WORKERS = int(os.environ.get('TTS_PIPELINE_WORKERS', 4))
+    # Render and cache replies sentence by sentence, joining the sentence
+    # renders, so recurring sentences are not sent to TTS again
+    AUDIO_SEGMENT_CACHE_ENABLED = os.environ.get('AUDIO_SEGMENT_CACHE_ENABLED', 'true').lower() == 'true'
+    # Pick each client's audio format from an explicit audio_format,
+    # Save-Data/ECT/Downlink client hints and Accept: Opus for clients that
+    # accept audio/webm on a slow link, MP3 otherwise
+    AUDIO_FORMAT_NEGOTIATION = os.environ.get('AUDIO_FORMAT_NEGOTIATION', 'true').lower() == 'true'
+    AUDIO_FORMATS_ENABLED = tuple(
+        os.environ.get('AUDIO_FORMATS_ENABLED', 'mp3,webm-opus,webm-opus-low').split(',')
+    )
+    # Serve speed changes to MP3 clients by time-stretching a stored speed
+    # 1.0 render and encoding it to MP3 (needs numpy and lameenc) instead
+    # of a new TTS call
+    TIME_STRETCH_ENABLED = os.environ.get('TIME_STRETCH_ENABLED', 'true').lower() == 'true'
+    # Pooled Azure synthesizers: concurrent calls and idle open connections
+    # kept per voice; idle connections older than TTS_POOL_MAX_IDLE_SECONDS
+    # are reopened before use
+    TTS_POOL_MAX_CONCURRENCY_PER_VOICE = int(os.environ.get('TTS_POOL_MAX_CONCURRENCY_PER_VOICE', 4))
+    TTS_POOL_MAX_IDLE_PER_VOICE = int(os.environ.get('TTS_POOL_MAX_IDLE_PER_VOICE', 4))
+    TTS_POOL_MAX_IDLE_SECONDS = int(os.environ.get('TTS_POOL_MAX_IDLE_SECONDS', 300))
+    TTS_POOL_CHECKOUT_TIMEOUT_SECONDS = int(os.environ.get('TTS_POOL_CHECKOUT_TIMEOUT_SECONDS', 30))
     
     # Neo4j configuration (for future graph database)
     NEO4J_URI = os.environ.get('NEO4J_URI')
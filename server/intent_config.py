@@ -0,0 +1,107 @@
+# Intent detection tables for the backend, keyed like LANGUAGE_CONFIG
+
+# Phrases that mean the user wants an explanation rather than a chat,
+# lowercase. Matched against the user's native language.
+TEACHING_KEYWORDS = {
+    'English': [
+        'what does', 'what is', "what's the meaning", 'meaning of', 'how do i', 'how do you say',
+        'explain', 'grammar', 'why', 'help me understand', "i don't understand", 'translate'
+    ],
+    'Spanish': [
+        'qué significa', 'que significa', 'qué quiere decir', 'cómo se dice', 'como se dice',
+        'explica', 'gramática', 'gramatica', 'por qué', 'no entiendo', 'ayúdame a entender', 'traduce'
+    ],
+    'French': [
+        'que veut dire', 'ça veut dire quoi', 'comment dit-on', 'comment on dit', 'explique',
+        'grammaire', 'pourquoi', 'je ne comprends pas', 'aide-moi à comprendre', 'traduis'
+    ],
+    'German': [
+        'was bedeutet', 'was heißt', 'wie sagt man', 'erkläre', 'erklär', 'grammatik', 'warum',
+        'ich verstehe nicht', 'ich verstehe das nicht', 'hilf mir zu verstehen', 'übersetze'
+    ],
+    'Italian': [
+        'cosa significa', 'che cosa vuol dire', 'cosa vuol dire', 'come si dice', 'spiega',
+        'grammatica', 'perché', 'non capisco', 'aiutami a capire', 'traduci'
+    ],
+    'Portuguese': [
+        'o que significa', 'o que quer dizer', 'como se diz', 'explica', 'gramática', 'por que',
+        'porquê', 'não entendo', 'me ajuda a entender', 'traduz'
+    ],
+    'Russian': [
+        'что значит', 'что означает', 'как сказать', 'объясни', 'грамматика', 'почему',
+        'не понимаю', 'помоги понять', 'переведи'
+    ],
+    'Chinese': [
+        '什么意思', '怎么说', '解释', '语法', '为什么', '我不明白', '我不懂', '翻译'
+    ],
+    'Japanese': [
+        'どういう意味', '意味は', '何と言います', 'どう言います', '説明して', '文法', 'なぜ',
+        'どうして', 'わかりません', '分かりません', '翻訳'
+    ],
+    'Korean': [
+        '무슨 뜻', '무슨 의미', '어떻게 말해', '설명해', '문법', '왜', '이해가 안', '모르겠어', '번역'
+    ],
+    'Arabic': [
+        'ماذا يعني', 'ما معنى', 'كيف أقول', 'كيف نقول', 'اشرح', 'قواعد', 'لماذا', 'لا أفهم',
+        'ساعدني', 'ترجم'
+    ],
+    'Hindi': [
+        'क्या मतलब', 'का मतलब', 'कैसे कहते', 'समझाओ', 'समझाइए', 'व्याकरण', 'क्यों',
+        'समझ नहीं', 'अनुवाद'
+    ]
+}
+
+# Writing system of each language, as a regex character class. Languages
+# sharing a script cannot be told apart by the script check.
+SCRIPTS = {
+    'latin': r'A-Za-zÀ-ÖØ-öø-ɏ',
+    'cyrillic': r'Ѐ-ӿ',
+    'han': r'一-鿿㐀-䶿',
+    'japanese': r'぀-ヿ一-鿿',
+    'hangul': r'가-힯ᄀ-ᇿ㄰-㆏',
+    'arabic': r'؀-ۿݐ-ݿ',
+    'devanagari': r'ऀ-ॿ'
+}
+
+LANGUAGE_SCRIPTS = {
+    'English': 'latin',
+    'Spanish': 'latin',
+    'French': 'latin',
+    'German': 'latin',
+    'Italian': 'latin',
+    'Portuguese': 'latin',
+    'Russian': 'cyrillic',
+    'Chinese': 'han',
+    'Japanese': 'japanese',
+    'Korean': 'hangul',
+    'Arabic': 'arabic',
+    'Hindi': 'devanagari'
+}
+
+# Scripts written without spaces between words: keywords match anywhere,
+# not only at the start of a word
+UNSPACED_SCRIPTS = {'han', 'japanese'}
+
+def get_teaching_keywords(language):
+    """
+    Get teaching keywords for a language.
+
+    Args:
+        language (str): The language name
+
+    Returns:
+        list: Lowercase keyword phrases
+    """
+    return list(TEACHING_KEYWORDS.get(language, TEACHING_KEYWORDS['English']))
+
+def get_language_script(language):
+    """
+    Get the writing system of a language.
+
+    Args:
+        language (str): The language name
+
+    Returns:
+        str: Script name (a key of SCRIPTS)
+    """
+    return LANGUAGE_SCRIPTS.get(language, 'latin')
@@ -0,0 +1,74 @@
+"""
+msgspec schemas for everything the file stores persist.
+
+These mirror the dict shapes used throughout the services (and the plain
+classes in user.py / conversation.py) so the storage layer can decode and
+validate records in one fast pass while callers keep working with dicts.
+"""
+from typing import Any, Dict, List, Optional
+
+import msgspec
+
+
+class User(msgspec.Struct):
+    id: str
+    username: str
+    email: str
+    password_hash: str
+    nativeLanguage: str
+    learningLanguage: str
+    created_at: str
+    personalization: Dict[str, Any] = {}
+
+
+class UserJournalRecord(msgspec.Struct, omit_defaults=True):
+    """One users.json.journal line: put / update / delete / reset"""
+    op: str
+    id: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+
+class Message(msgspec.Struct):
+    id: str
+    content: str
+    sender: str
+    timestamp: str
+    intent: Optional[str] = None
+    audio_language: Optional[str] = None
+
+
+class Conversation(msgspec.Struct):
+    """Conversation metadata as kept in the side header (no messages)"""
+    id: str
+    user_id: str
+    created_at: str
+    summary: str = ''
+    current_topic: Optional[str] = None
+    user_message_count: Optional[int] = None
+    messages_since_summary: Optional[int] = None
+    summary_mark: Optional[int] = None  # Messages already folded into summary
+
+
+class ConversationWithMessages(Conversation):
+    messages: List[Message] = []
+
+
+class ConversationHeader(msgspec.Struct):
+    """Per-user <user_id>.header.json"""
+    user_id: str
+    current_conversation_id: Optional[str] = None
+    conversations: List[Conversation] = []
+    message_counts: Dict[str, int] = {}
+
+
+class ConversationDocument(msgspec.Struct):
+    """Per-user conversations document (also the legacy <user_id>.json format)"""
+    user_id: str
+    conversations: List[ConversationWithMessages] = []
+    current_conversation_id: Optional[str] = None
+
+
+class ConversationLogRecord(msgspec.Struct):
+    """One <user_id>.jsonl line"""
+    conversation_id: str
+    message: Message
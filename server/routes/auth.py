@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from ..models.user import User
 from ..utils.auth_utils import hash_password, verify_password, generate_token, token_required
-from ..utils.file_utils import load_users, save_users, find_user_by_email, find_user_by_id
+from ..utils.file_utils import add_user, update_user, find_user_by_email, find_user_by_id
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -32,10 +32,7 @@ def signup():
         )
         
         # Save user to file
-        users_data = load_users()
-        users_data[user.id] = user.to_dict()
-        
-        if save_users(users_data):
+        if add_user(user.id, user.to_dict()):
             # Generate token
             token = generate_token(user.id)
             
@@ -73,9 +70,10 @@ def login():
             user_data['nativeLanguage'] = data['nativeLanguage']
             user_data['learningLanguage'] = data['learningLanguage']
             
-            users_data = load_users()
-            users_data[user_id] = user_data
-            save_users(users_data)
+            update_user(user_id, {
+                'nativeLanguage': data['nativeLanguage'],
+                'learningLanguage': data['learningLanguage']
+            })
         
         # Generate token
         token = generate_token(user_id)
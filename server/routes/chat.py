@@ -1,12 +1,40 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, send_file, current_app
 from ..utils.auth_utils import token_required
 from ..services.chat_service import ChatService
+from ..utils.audio_store import AUDIO_MIMETYPES
+from ..utils.audio_formats import negotiate_audio_format, DEFAULT_AUDIO_FORMAT
+import json
+import re
 
 chat_bp = Blueprint('chat', __name__)
 
 # CHANGED: Create single service instance instead of factory function
 chat_service = ChatService()
 
+# Network client hints used to pick the audio format
+AUDIO_CLIENT_HINTS = 'Save-Data, ECT, Downlink'
+
+# Endpoints whose response depends on the negotiated audio format
+NEGOTIATED_ENDPOINTS = {'chat.send_message', 'chat.stream_message', 'chat.regenerate_audio'}
+
+@chat_bp.after_request
+def request_client_hints(response):
+    """Ask the browser to send network hints on later requests"""
+    response.headers['Accept-CH'] = AUDIO_CLIENT_HINTS
+    if request.endpoint in NEGOTIATED_ENDPOINTS:
+        response.headers.add('Vary', f'Accept, {AUDIO_CLIENT_HINTS}')
+    return response
+
+def _audio_format(data):
+    """Audio format for this request: explicit audio_format, client hints, Accept"""
+    if not current_app.config.get('AUDIO_FORMAT_NEGOTIATION', True):
+        return DEFAULT_AUDIO_FORMAT
+    return negotiate_audio_format(
+        data.get('audio_format'),
+        request.headers,
+        current_app.config.get('AUDIO_FORMATS_ENABLED', ('mp3', 'webm-opus', 'webm-opus-low'))
+    )
+
 @chat_bp.route('/message', methods=['POST'])
 @token_required
 def send_message(user_id):
@@ -29,26 +57,69 @@ def send_message(user_id):
             audio_speed = 0.8
         
         # Generate response using persistent service with audio
-        result = chat_service.generate_response(user_id, message_content, audio_speed)
+        result = chat_service.generate_response(user_id, message_content, audio_speed, _audio_format(data))
         
         if 'error' in result:
             return jsonify({
                 'response': result['response'],
                 'intent': result['intent'],
                 'audio_language': result['audio_language'],
-                'audio_data': result.get('audio_data')  # May be None on error
+                'audio_id': result.get('audio_id')  # May be None on error
             }), 500
         
         return jsonify({
             'response': result['response'],
             'intent': result['intent'],
             'audio_language': result['audio_language'],
-            'audio_data': result['audio_data']
+            'audio_id': result['audio_id'],
+            'message_id': result.get('message_id')
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+def _format_sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@chat_bp.route('/message/stream', methods=['POST'])
+@token_required
+def stream_message(user_id):
+    """Send a message and stream the bot response as Server-Sent Events"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('message'):
+            return jsonify({'error': 'Message content is required'}), 400
+        
+        message_content = data['message'].strip()
+        if not message_content:
+            return jsonify({'error': 'Message cannot be empty'}), 400
+        
+        audio_speed = data.get('audio_speed', 0.8)
+        if not 0.5 <= audio_speed <= 1.5:
+            audio_speed = 0.8
+        
+        audio_format = _audio_format(data)
+        
+        def generate():
+            for event, payload in chat_service.stream_response(user_id, message_content, audio_speed, audio_format):
+                if event == 'error':
+                    payload = {key: value for key, value in payload.items() if key != 'error'}
+                yield _format_sse(event, payload)
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Don't let a reverse proxy buffer the stream
+            }
+        )
+        
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
 @chat_bp.route('/history', methods=['GET'])
 @token_required
 def get_history(user_id):
@@ -78,11 +149,11 @@ def regenerate_audio(user_id):
     try:
         data = request.get_json()
         
-        if not data or not data.get('text') or not data.get('language'):
-            return jsonify({'error': 'Text and language are required'}), 400
+        # A stored message is referenced by id; free text (e.g. the
+        # client-side greeting) still needs text and language
+        if not data or not (data.get('message_id') or (data.get('text') and data.get('language'))):
+            return jsonify({'error': 'message_id, or text and language, are required'}), 400
         
-        text = data['text']
-        language = data['language']
         audio_speed = data.get('audio_speed', 0.8)
         
         # Validate audio speed
@@ -90,12 +161,43 @@ def regenerate_audio(user_id):
             audio_speed = 0.8
         
         # Generate audio only
-        audio_data = chat_service.generate_audio(text, language, audio_speed)
+        audio_format = _audio_format(data)
+        if data.get('message_id'):
+            message = chat_service.conversation_service.find_message(user_id, data['message_id'])
+            if not message:
+                return jsonify({'error': 'Message not found'}), 404
+            audio_id = chat_service.generate_message_audio(user_id, message, audio_speed, audio_format)
+        else:
+            audio_id = chat_service.generate_speed_variant(data['text'], data['language'], audio_speed, audio_format)
         
-        if audio_data:
-            return jsonify({'audio_data': audio_data}), 200
+        if audio_id:
+            return jsonify({'audio_id': audio_id}), 200
         else:
             return jsonify({'error': 'Failed to generate audio'}), 500
             
     except Exception as e:
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+# Audio ids are SHA-256 content addresses
+AUDIO_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+@chat_bp.route('/audio/<audio_id>', methods=['GET'])
+def get_audio(audio_id):
+    """
+    Stream a rendered clip (MP3 or WebM/Opus), with ETag, Range and
+    conditional request support. Not token protected: <audio src> cannot
+    send an Authorization header, and ids are unguessable content hashes.
+    """
+    if not AUDIO_ID_PATTERN.fullmatch(audio_id):
+        return jsonify({'error': 'Audio not found'}), 404
+    
+    path, audio_format = chat_service.get_audio_path(audio_id)
+    if not path:
+        return jsonify({'error': 'Audio not found'}), 404
+    
+    # send_file hands the file to the server's sendfile path and answers
+    # Range / If-None-Match itself
+    response = send_file(path, mimetype=AUDIO_MIMETYPES[audio_format], conditional=True, etag=audio_id)
+    # Content-addressed: a given id never changes
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
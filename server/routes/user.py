@@ -5,6 +5,7 @@ from ..models.user import User
 import logging
 from ..database import setup_user_graph, update_from_personalization, get_user_context
 from ..services.personalization_service import PersonalizationService
+from ..services.chat_service import invalidate_prompt_prefix
 
 user_bp = Blueprint('user', __name__)
 
@@ -42,8 +43,10 @@ def update_personalization(user_id):
             logging.error(f"Graph processing traceback: {traceback.format_exc()}")
             # Continue to save to JSON even if graph processing fails
         
-        # Save to file system
-        if update_user(user_id, user_data):
+        # Save to file system (only the changed field, so concurrent
+        # profile edits for the same user are not overwritten)
+        if update_user(user_id, {'personalization': user_data['personalization']}):
+            invalidate_prompt_prefix(user_id)
             user = User.from_dict(user_data)
             return jsonify({
                 'message': 'Personalization updated successfully',
@@ -71,7 +74,8 @@ def delete_personalization(user_id):
         # TODO: Also clear graph data if needed
         # You might want to add a method to PersonalizationService to handle deletion
         
-        if update_user(user_id, user_data):
+        if update_user(user_id, {'personalization': {}}):
+            invalidate_prompt_prefix(user_id)
             user = User.from_dict(user_data)
             return jsonify({
                 'message': 'Personalization data deleted successfully',
@@ -97,11 +101,11 @@ def update_profile(user_id):
         
         # Update allowed fields
         allowed_fields = ['username', 'nativeLanguage', 'learningLanguage']
-        for field in allowed_fields:
-            if field in data:
-                user_data[field] = data[field]
+        changes = {field: data[field] for field in allowed_fields if field in data}
+        user_data.update(changes)
         
-        if update_user(user_id, user_data):
+        if update_user(user_id, changes):
+            invalidate_prompt_prefix(user_id)
             user = User.from_dict(user_data)
             return jsonify({
                 'message': 'Profile updated successfully',
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+from flask import current_app
+from ..language_config import LANGUAGE_CONFIG, get_voice_name, get_error_message
+from ..utils.lock_utils import atomic_write
+
+# Playback speeds offered by the client's speed selector
+DEFAULT_WARMUP_SPEEDS = (0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.2)
+
+# Placeholder reply while teaching mode is not implemented
+TEACHING_PLACEHOLDER = "I detected you need help! For now, I'll continue chatting in {language}. Teaching mode coming soon!"
+
+def get_teaching_placeholder(language):
+    return TEACHING_PLACEHOLDER.format(language=language)
+
+def get_canned_texts(language):
+    """Every fixed string the server may speak in language"""
+    return [get_error_message(language), get_teaching_placeholder(language)]
+
+
+class CannedAudio:
+    """
+    Pre-rendered audio for the fixed error and placeholder replies.
+
+    Renders are written once to DATA_DIR/audio/canned and served from
+    there by id like any other clip, so those paths answer instantly and
+    never call the TTS service, even while it is down. Lookups never
+    synthesize: a missing speed falls back to the nearest rendered one, a
+    missing text to None.
+    """
+
+    def __init__(self, directory, speeds=DEFAULT_WARMUP_SPEEDS):
+        self.directory = directory
+        self.speeds = tuple(sorted(speeds))
+        os.makedirs(directory, exist_ok=True)
+
+    def _key(self, text, language, speed_rate):
+        voice_name = get_voice_name(language)
+        return hashlib.sha256(f"{voice_name}|{speed_rate:.1f}|{text}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.mp3')
+
+    def get_id(self, text, language, speed_rate):
+        """Audio id of a canned text's render, or None if it was never rendered"""
+        nearest = min(self.speeds, key=lambda speed: (abs(speed - speed_rate), speed))
+        for speed in (speed_rate, nearest):
+            key = self._key(text, language, speed)
+            if os.path.exists(self._path(key)):
+                return key
+        return None
+
+    def path_for_id(self, audio_id):
+        """File of a canned render, or None"""
+        path = self._path(audio_id)
+        return path if os.path.exists(path) else None
+
+    def warm_up(self, synthesize, languages=None):
+        """
+        Render every canned text for every language and speed that is not
+        on disk yet. synthesize(text, language, speed_rate) returns MP3
+        bytes or None. Returns the number of new renders.
+        """
+        rendered = 0
+        for language in languages or LANGUAGE_CONFIG:
+            for text in get_canned_texts(language):
+                for speed in self.speeds:
+                    key = self._key(text, language, speed)
+                    if os.path.exists(self._path(key)):
+                        continue
+                    audio_data = synthesize(text, language, speed)
+                    if not audio_data:
+                        print(f"Canned audio warm-up stopped: synthesis failed for {language} at {speed}")
+                        return rendered
+                    atomic_write(self._path(key), audio_data)
+                    rendered += 1
+        return rendered
+
+
+_canned_audio = None
+_canned_audio_lock = threading.Lock()
+
+def get_canned_audio():
+    """Process-wide canned audio under the app's DATA_DIR"""
+    global _canned_audio
+    with _canned_audio_lock:
+        if _canned_audio is None:
+            speeds = current_app.config.get('AUDIO_WARMUP_SPEEDS') or DEFAULT_WARMUP_SPEEDS
+            _canned_audio = CannedAudio(
+                os.path.join(current_app.config['DATA_DIR'], 'audio', 'canned'), speeds
+            )
+        return _canned_audio
+
+def start_audio_warmup(app, synthesize, prepare=None):
+    """
+    Render missing canned audio on a background thread at startup, after
+    calling prepare() (if given) on the same thread
+    """
+    def run():
+        with app.app_context():
+            if prepare:
+                try:
+                    prepare()
+                except Exception as e:
+                    print(f"Audio warm-up preparation failed: {e}")
+            rendered = get_canned_audio().warm_up(synthesize)
+            if rendered:
+                print(f"Canned audio warm-up rendered {rendered} clips")
+
+    thread = threading.Thread(target=run, name='audio-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -3,21 +3,80 @@ import azure.cognitiveservices.speech as speechsdk
 from ..models.conversation import Conversation, Message
 from ..utils.file_utils import find_user_by_id
 from .conversation_service import ConversationService
-from ..language_config import get_voice_name, get_pause_durations, get_error_message
+from .speech_pipeline import SpeechPipeline, get_tts_executor, split_sentences
+from .synthesizer_pool import (
+    get_synthesizer_pool, DEFAULT_OUTPUT_FORMAT, PCM_OUTPUT_FORMAT, AZURE_OUTPUT_FORMATS
+)
+from .canned_audio import get_canned_audio, get_teaching_placeholder, start_audio_warmup
+from ..utils.intent_utils import detect_intent
+from ..utils.audio_cache import get_audio_cache, audio_cache_key
+from ..utils.audio_store import get_audio_store, audio_store_key, derived_audio_key
+from ..utils import time_stretch
+from ..utils.mp3_utils import concat_mp3
+from ..utils.audio_formats import DEFAULT_AUDIO_FORMAT, get_audio_format
+from ..utils.prompt_utils import (
+    prompt_section, assemble_messages, truncate_to_tokens, get_prompt_budget
+)
+from ..utils.ssml_utils import build_ssml
+from ..language_config import LANGUAGE_CONFIG, get_voice_name, get_error_message
 
 from flask import current_app
 import json
 import os
-import base64
 import io
+from collections import OrderedDict
+from threading import Lock
+
+# Memoized static prompt prefixes: user_id -> (fingerprint, prefix)
+PROMPT_PREFIX_CACHE_SIZE = 1024
+_prompt_prefixes = OrderedDict()
+_prompt_prefixes_lock = Lock()
+
+def _prefix_fingerprint(user):
+    """Everything the static prefix is built from"""
+    personalization = user.get('personalization') or {}
+    return (
+        user['username'], user['nativeLanguage'], user['learningLanguage'],
+        personalization.get('currentLocation'), personalization.get('workStudy')
+    )
+
+def get_prompt_prefix(user, build):
+    """Cached build(user), rebuilt when the user's profile fields change"""
+    fingerprint = _prefix_fingerprint(user)
+    with _prompt_prefixes_lock:
+        entry = _prompt_prefixes.get(user['id'])
+        if entry and entry[0] == fingerprint:
+            _prompt_prefixes.move_to_end(user['id'])
+            return entry[1]
+    
+    prefix = build(user)
+    with _prompt_prefixes_lock:
+        _prompt_prefixes[user['id']] = (fingerprint, prefix)
+        _prompt_prefixes.move_to_end(user['id'])
+        while len(_prompt_prefixes) > PROMPT_PREFIX_CACHE_SIZE:
+            _prompt_prefixes.popitem(last=False)
+    return prefix
+
+def invalidate_prompt_prefix(user_id):
+    """Drop a user's cached prefix after a profile or personalization change"""
+    with _prompt_prefixes_lock:
+        _prompt_prefixes.pop(user_id, None)
+
+# Longest a single history message may be in the prompt
+MAX_HISTORY_MESSAGE_TOKENS = 200
+# When the prompt is over budget, sections go lowest priority first:
+# older messages, then summaries, then the latest few messages
+OLDER_MESSAGE_PRIORITY = 1
+SUMMARY_PRIORITY = 2
+LATEST_MESSAGE_PRIORITY = 3
+LATEST_MESSAGES_KEPT = 4
 
 class ChatService:
     def __init__(self):
         self._openai_client = None
-        self._speech_config = None
+        self._segment_executor = None
+        self._segment_settings_loaded = False
         self.conversation_service = ConversationService()
-        # Cache for audio data during session
-        self._audio_cache = {}
     
     @property
     def openai_client(self):
@@ -30,22 +89,34 @@ class ChatService:
         return self._openai_client
     
     @property
-    def speech_config(self):
-        """Lazy initialization of Azure Speech config"""
-        if self._speech_config is None:
-            speech_key = current_app.config.get('AZURE_SPEECH_KEY')
-            speech_region = current_app.config.get('AZURE_SPEECH_REGION')
-            if not speech_key or not speech_region:
-                raise ValueError("Azure Speech credentials not configured")
-            self._speech_config = speechsdk.SpeechConfig(
-                subscription=speech_key, 
-                region=speech_region
-            )
-            # Set to MP3 format for smaller size and faster transmission
-            self._speech_config.set_speech_synthesis_output_format(
-                speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3
-            )
-        return self._speech_config
+    def segment_executor(self):
+        """Worker pool rendering a reply's sentences, or None with AUDIO_SEGMENT_CACHE_ENABLED off"""
+        if not self._segment_settings_loaded:
+            if current_app.config.get('AUDIO_SEGMENT_CACHE_ENABLED', True):
+                # Separate from the pipeline's pool: pipeline workers call into this one
+                self._segment_executor = get_tts_executor(
+                    current_app.config.get('TTS_PIPELINE_WORKERS', 4), name='tts-segment'
+                )
+            self._segment_settings_loaded = True
+        return self._segment_executor
+    
+    @property
+    def synthesizer_pool(self):
+        """Shared pool of Azure synthesizers with open connections"""
+        return get_synthesizer_pool()
+    
+    def _resolve_audio_resources(self):
+        """
+        Create the app-configured audio singletons in the calling thread,
+        before work goes to a TTS pool: pool threads have no app context
+        """
+        get_audio_cache()
+        get_audio_store()
+        self.segment_executor
+        try:
+            self.synthesizer_pool
+        except ValueError as e:
+            print(f"Speech synthesis disabled: {e}")
     
     def _get_voice_name(self, language, voice_type='male'):
         """Map language to Azure voice name using language config"""
@@ -53,79 +124,30 @@ class ChatService:
 
     def _add_speech_marks(self, text, speed_rate=1.0, voice_name="en-US-AriaNeural"):
         """Add SSML markup for natural pauses, speed, and voice"""
-        prosody_rate = f"{speed_rate:.1f}"
-        
-        # Get pause durations from config
-        pauses = get_pause_durations()
-        pause_multiplier = 1.0 / speed_rate
-        
-        # Calculate pause durations based on speed
-        sentence_pause = int(pauses['sentence'] * pause_multiplier)
-        comma_pause = int(pauses['comma'] * pause_multiplier)
-        semicolon_pause = int(pauses['semicolon'] * pause_multiplier)
-        
-        # Apply pauses
-        text = text.replace('.', f'.<break time="{sentence_pause}ms"/>')
-        text = text.replace(',', f',<break time="{comma_pause}ms"/>')
-        text = text.replace('!', f'!<break time="{sentence_pause}ms"/>')
-        text = text.replace('?', f'?<break time="{sentence_pause}ms"/>')
-        text = text.replace(';', f';<break time="{semicolon_pause}ms"/>')
-
-        ssml = f'''<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">
-            <voice name="{voice_name}">
-                <prosody rate="{prosody_rate}">
-                    {text}
-                </prosody>
-            </voice>
-        </speak>'''
-        
-        return ssml
+        return build_ssml(text, voice_name, speed_rate)
     
-    def generate_audio(self, text, language, speed_rate=0.8):
-        """Generate audio using Azure TTS"""
+    def _render_ssml(self, ssml_text, voice_name, speed_rate, output_format=DEFAULT_OUTPUT_FORMAT):
+        """Synthesize SSML to audio bytes (MP3 by default) with Azure TTS; None on failure"""
         try:
-            # Check cache first
-            cache_key = f"{text}_{language}_{speed_rate}"
-            if cache_key in self._audio_cache:
-                return self._audio_cache[cache_key]
-            
-            # Set voice based on language
-            voice_name = self._get_voice_name(language)
-            self.speech_config.speech_synthesis_voice_name = voice_name
-            
-            # Create synthesizer without audio config to get audio data directly
-            synthesizer = speechsdk.SpeechSynthesizer(
-                speech_config=self.speech_config,
-                audio_config=None  # This will return audio data in result
-            )
-            
-            # Add SSML markup for pauses and speed
-            ssml_text = self._add_speech_marks(text, speed_rate, voice_name)
-            
-            # Synthesize speech
-            result = synthesizer.speak_ssml_async(ssml_text).get()
-            
-            if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-                # Get audio data directly from result
-                audio_data = result.audio_data
-                
-                # Encode as base64
-                audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+            # Checked out for this call only, already set to the voice
+            with self.synthesizer_pool.checkout(voice_name, output_format) as synthesizer:
+                result = synthesizer.speak_ssml(ssml_text)
                 
-                # Cache the result
-                self._audio_cache[cache_key] = audio_base64
-                print(f"Generated audio with speed: {speed_rate}")
-
-                return audio_base64
-            elif result.reason == speechsdk.ResultReason.Canceled:
-                cancellation = result.cancellation_details
-                print(f"Speech synthesis canceled: {cancellation.reason}")
-                if cancellation.reason == speechsdk.CancellationReason.Error:
-                    print(f"Error details: {cancellation.error_details}")
-                return None
-            else:
-                print(f"Speech synthesis failed: {result.reason}")
-                return None
+                if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+                    print(f"Generated audio with speed: {speed_rate}")
+                    # Get audio data directly from result
+                    return result.audio_data
+                elif result.reason == speechsdk.ResultReason.Canceled:
+                    cancellation = result.cancellation_details
+                    print(f"Speech synthesis canceled: {cancellation.reason}")
+                    if cancellation.reason == speechsdk.CancellationReason.Error:
+                        print(f"Error details: {cancellation.error_details}")
+                        # Connection may be bad; replace this synthesizer
+                        synthesizer.broken = True
+                    return None
+                else:
+                    print(f"Speech synthesis failed: {result.reason}")
+                    return None
                 
         except Exception as e:
             print(f"Error generating audio: {str(e)}")
@@ -133,31 +155,212 @@ class ChatService:
             traceback.print_exc()
             return None
     
-    def detect_intent(self, message, user_native_language, user_learning_language):
+    def synthesize_audio(self, text, language, speed_rate=0.8):
+        """Synthesize MP3 bytes with Azure TTS (no caching); None on failure"""
+        voice_name = self._get_voice_name(language)
+        # Add SSML markup for pauses and speed
+        ssml_text = self._add_speech_marks(text, speed_rate, voice_name)
+        return self._render_ssml(ssml_text, voice_name, speed_rate)
+    
+    def _segments(self, text, audio_format=DEFAULT_AUDIO_FORMAT):
         """
-        Simple intent detection based on language.
-        Target language = chat mode
-        Native language = teaching mode
+        The sentences text is rendered as, or [text] without segment
+        caching or in a format whose renders cannot be joined
         """
-        # Simple keyword detection for teaching mode
-        teaching_keywords = [
-            'what does', 'how do i', 'explain', 'grammar', 'why',
-            'what is', 'help me understand', 'i don\'t understand'
+        if self.segment_executor is None or not get_audio_format(audio_format)['stitchable']:
+            return [text]
+        return split_sentences(text) or [text]
+    
+    def _segment_id(self, text, voice_name, speed_rate, audio_format=DEFAULT_AUDIO_FORMAT):
+        return audio_store_key(self._add_speech_marks(text, speed_rate, voice_name), voice_name, audio_format)
+    
+    def _audio_id(self, text, language, speed_rate, audio_format=DEFAULT_AUDIO_FORMAT):
+        """The id _get_audio returns for text, without rendering anything"""
+        voice_name = self._get_voice_name(language)
+        segment_ids = [
+            self._segment_id(segment, voice_name, speed_rate, audio_format)
+            for segment in self._segments(text, audio_format)
         ]
+        if len(segment_ids) == 1:
+            return segment_ids[0]
+        return derived_audio_key(' '.join(segment_ids), 'concat')
+    
+    def _get_audio(self, text, language, speed_rate, audio_format=DEFAULT_AUDIO_FORMAT):
+        """
+        (audio_id, audio bytes) for text. MP3 replies are rendered and cached
+        sentence by sentence: stock sentences (greetings, follow-up
+        questions) recur across replies far more often than whole
+        replies do, so most sentences are cache hits and only the misses
+        go to TTS, in parallel. The sentence renders are then joined
+        frame by frame; each one's SSML already ends with the sentence
+        pause. The joined reply is stored under an id derived from its
+        sentences' ids.
+        """
+        voice_name = self._get_voice_name(language)
+        segments = self._segments(text, audio_format)
+        if len(segments) == 1:
+            return self._get_segment_audio(text, voice_name, speed_rate, audio_format)
         
-        message_lower = message.lower()
+        segment_ids = [self._segment_id(segment, voice_name, speed_rate, audio_format) for segment in segments]
+        audio_id = derived_audio_key(' '.join(segment_ids), 'concat')
+        audio_store = get_audio_store()
+        audio_cache = get_audio_cache()
         
-        # Check for teaching keywords in any language
-        for keyword in teaching_keywords:
-            if keyword in message_lower:
-                return 'teaching'
+        audio_data = audio_cache.get(audio_id)
+        if audio_data is not None:
+            if not audio_store.exists(audio_id):  # Evicted from disk meanwhile
+                audio_store.put(audio_id, audio_data)
+            return audio_id, audio_data
         
-        # Default to chat mode
-        return 'chat'
+        audio_data = audio_store.read(audio_id)
+        if audio_data is None:
+            self._resolve_audio_resources()
+            renders = list(self.segment_executor.map(
+                lambda segment: self._get_segment_audio(segment, voice_name, speed_rate, audio_format)[1],
+                segments
+            ))
+            if not all(renders):
+                return None, None
+            audio_data = concat_mp3(renders)
+            audio_store.put(audio_id, audio_data)
+        audio_cache.put(audio_id, audio_data)
+        return audio_id, audio_data
     
-    def build_chat_prompt(self, user, conversation_context, current_message):
-        """Build optimized prompt for chatbot with enhanced memory"""
+    def _get_segment_audio(self, text, voice_name, speed_rate, audio_format=DEFAULT_AUDIO_FORMAT):
+        """
+        (audio_id, audio bytes) for one render of text, from the in-memory
+        cache, then the on-disk store shared by all workers, and only then
+        from Azure TTS. The id is the render's content address in the store.
+        """
+        ssml_text = self._add_speech_marks(text, speed_rate, voice_name)
+        audio_id = audio_store_key(ssml_text, voice_name, audio_format)
+        extension = get_audio_format(audio_format)['extension']
+        audio_store = get_audio_store()
+        
+        # Check the shared memory cache first
+        audio_cache = get_audio_cache()
+        cache_key = audio_cache_key(text, voice_name, speed_rate, audio_format)
+        audio_data = audio_cache.get(cache_key)
+        if audio_data is not None:
+            if not audio_store.exists(audio_id, extension):  # Evicted from disk meanwhile
+                audio_store.put(audio_id, audio_data, extension)
+            return audio_id, audio_data
         
+        # Then the disk store; a miss is rendered once across all workers
+        audio_data = audio_store.get_or_render(
+            audio_id,
+            lambda: self._render_ssml(ssml_text, voice_name, speed_rate, AZURE_OUTPUT_FORMATS[audio_format]),
+            extension
+        )
+        if not audio_data:
+            return None, None
+        audio_cache.put(cache_key, audio_data)
+        return audio_id, audio_data
+    
+    def get_audio_bytes(self, text, language, speed_rate=0.8, audio_format=DEFAULT_AUDIO_FORMAT):
+        """Audio bytes for text (cached); None on failure"""
+        return self._get_audio(text, language, speed_rate, audio_format)[1]
+    
+    def generate_audio(self, text, language, speed_rate=0.8, audio_format=DEFAULT_AUDIO_FORMAT):
+        """
+        Generate audio using Azure TTS. Returns the audio id to fetch from
+        /api/chat/audio/<id>, or None on failure.
+        """
+        return self._get_audio(text, language, speed_rate, audio_format)[0]
+    
+    def _get_pcm_render(self, text, language):
+        """(audio_id, WAV bytes) of text rendered at speed 1.0, stored once"""
+        voice_name = self._get_voice_name(language)
+        ssml_text = self._add_speech_marks(text, 1.0, voice_name)
+        audio_id = audio_store_key(ssml_text, voice_name, 'wav')
+        audio_data = get_audio_store().get_or_render(
+            audio_id,
+            lambda: self._render_ssml(ssml_text, voice_name, 1.0, PCM_OUTPUT_FORMAT),
+            'wav'
+        )
+        return audio_id, audio_data
+    
+    def generate_speed_variant(self, text, language, speed_rate=0.8, audio_format=DEFAULT_AUDIO_FORMAT):
+        """
+        Audio id for text at a new playback speed. A render already made
+        at that speed is reused as is; otherwise, for MP3 clients, the
+        text's speed 1.0 PCM render (one TTS call per text, ever) is
+        time-stretched locally and encoded to MP3, so moving the speed
+        slider costs milliseconds of CPU instead of a TTS round trip. With
+        TIME_STRETCH_ENABLED off, without numpy or lameenc, or for clients
+        on Opus (there is no WebM/Opus encoder here) it renders at the new
+        speed like generate_audio.
+        """
+        audio_id = self._audio_id(text, language, speed_rate, audio_format)
+        if get_audio_store().exists(audio_id, get_audio_format(audio_format)['extension']):
+            return audio_id
+        
+        if not (
+            audio_format == DEFAULT_AUDIO_FORMAT
+            and time_stretch.is_available()
+            and current_app.config.get('TIME_STRETCH_ENABLED', True)
+        ):
+            return self.generate_audio(text, language, speed_rate, audio_format)
+        
+        source_id, source_data = self._get_pcm_render(text, language)
+        if not source_data:
+            return None
+        
+        audio_id = derived_audio_key(source_id, f'wsola-mp3:{speed_rate:.2f}')
+        try:
+            audio_data = get_audio_store().get_or_render(
+                audio_id, lambda: time_stretch.stretch_wav_to_mp3(source_data, speed_rate), 'mp3'
+            )
+        except Exception as e:
+            print(f"Time stretch failed, rendering instead: {e}")
+            return self.generate_audio(text, language, speed_rate, audio_format)
+        return audio_id if audio_data else None
+    
+    def get_audio_path(self, audio_id):
+        """(file, format) of the render with this id (store or canned), or (None, None)"""
+        path, audio_format = get_audio_store().find(audio_id)
+        if path:
+            return path, audio_format
+        path = get_canned_audio().path_for_id(audio_id)
+        return (path, 'mp3') if path else (None, None)
+    
+    def start_audio_warmup(self, app):
+        """
+        Open a synthesizer connection per voice and pre-render the canned
+        replies for every language in the background
+        """
+        voice_names = [self._get_voice_name(language) for language in LANGUAGE_CONFIG]
+        return start_audio_warmup(
+            app, self.synthesize_audio,
+            prepare=lambda: self.synthesizer_pool.prewarm(voice_names)
+        )
+    
+    def detect_intent(self, message, user_native_language, user_learning_language):
+        """
+        Simple intent detection based on language.
+        Target language = chat mode
+        Native language = teaching mode
+        """
+        return detect_intent(
+            message,
+            user_native_language,
+            user_learning_language,
+            script_check=current_app.config.get('INTENT_SCRIPT_CHECK', True)
+        )
+    
+    @property
+    def chat_model(self):
+        return current_app.config.get('CHAT_MODEL', 'gpt-4')
+    
+    def _prompt_prefix(self, user):
+        """
+        Static start of every chat prompt for this user and language pair:
+        persona, user details, guidelines. Built once and reused byte for
+        byte, so the provider can serve it from its prompt cache.
+        """
+        return get_prompt_prefix(user, self._build_prompt_prefix)
+    
+    def _build_prompt_prefix(self, user):
         # Base system prompt
         system_prompt = f"""You are a friendly language exchange partner helping {user['username']} practice {user['learningLanguage']}. 
 
@@ -185,127 +388,246 @@ Guidelines:
 - Be encouraging and patient
 - Correct major errors gently by using the correct form in your response
 - Show genuine interest in the user's responses
-- Vary your questions to keep the conversation engaging"""
+- Vary your questions to keep the conversation engaging
+
+Remember to always use {user['learningLanguage']} and keep your response brief. Ask a question at the end of each response."""
+        
+        return system_prompt
+    
+    def build_chat_prompt(self, user, conversation_context, current_message):
+        """
+        Build the chat request messages with enhanced memory.
+        
+        Layout, most stable first so providers can cache the prefix: the
+        memoized per-user system prompt, a system message with previous
+        conversation highlights, the recent history as real user/assistant
+        turns, then the current message. Returns (messages, prompt_tokens):
+        the messages fit the model's token budget (older turns go first,
+        then summaries, then the latest turns) and prompt_tokens counts the
+        whole request.
+        """
+        model = self.chat_model
+        sections = [prompt_section(self._prompt_prefix(user), role='system')]
 
         # Add conversation summaries for long-term memory
         if conversation_context['conversation_summaries']:
-            system_prompt += "\n\nPrevious conversation highlights:"
+            sections.append(prompt_section("Previous conversation highlights:", group='summaries', header=True, role='system'))
             for summary in conversation_context['conversation_summaries']:
-                system_prompt += f"\n{summary}"
+                sections.append(prompt_section(f"\n{summary}", SUMMARY_PRIORITY, 'summaries'))
 
-        # Add recent conversation context
-        if conversation_context['recent_messages']:
-            system_prompt += "\n\nRecent conversation:"
-            for msg in conversation_context['recent_messages']:
-                system_prompt += f"\n{msg['sender']}: {msg['content']}"
+        # Recent history as chat turns; the current message was already
+        # stored by the turn, so it is not repeated here
+        recent_messages = list(conversation_context['recent_messages'])
+        if recent_messages and recent_messages[-1]['sender'] == 'user' and recent_messages[-1]['content'] == current_message:
+            recent_messages.pop()
+        for i, msg in enumerate(recent_messages):
+            content = truncate_to_tokens(msg['content'], MAX_HISTORY_MESSAGE_TOKENS, model)
+            priority = LATEST_MESSAGE_PRIORITY if i >= len(recent_messages) - LATEST_MESSAGES_KEPT else OLDER_MESSAGE_PRIORITY
+            role = 'user' if msg['sender'] == 'user' else 'assistant'
+            sections.append(prompt_section(content, priority, role=role))
 
-        # Add behavior instructions
-        system_prompt += f"\n\nRemember to always use {user['learningLanguage']} and keep your response brief. Ask a question at the end of each response."
+        sections.append(prompt_section(current_message, role='user'))
         
-        return system_prompt
+        budget = get_prompt_budget(model, current_app.config.get('CHAT_PROMPT_TOKEN_BUDGET', 0))
+        messages, prompt_tokens = assemble_messages(sections, budget, model)
+        
+        if prompt_tokens > budget:
+            print(f"Prompt over budget after trimming: {prompt_tokens}/{budget} tokens")
+        
+        return messages, prompt_tokens
     
-    def generate_response(self, user_id, message_content, audio_speed=0.8):
+    def _chat_completion(self, messages, stream=False):
+        """Call OpenAI with the assembled messages"""
+        return self.openai_client.chat.completions.create(
+            model=self.chat_model,
+            messages=messages,
+            temperature=0.3,  # Low creativity for consistency
+            max_tokens=150,   # Keep responses brief
+            stream=stream
+        )
+    
+    def _teaching_result(self, user_data, audio_speed):
+        """Placeholder reply until the teaching service exists"""
+        # TODO: Route to teaching service
+        response_text = get_teaching_placeholder(user_data['learningLanguage'])
+        
+        return {
+            'response': response_text,
+            'intent': 'teaching',
+            'audio_language': user_data['learningLanguage'],
+            # Pre-rendered at startup; never calls the TTS service
+            'audio_id': get_canned_audio().get_id(response_text, user_data['learningLanguage'], audio_speed)
+        }
+    
+    def _error_result(self, user_data, audio_speed, error):
+        """Localized apology returned when a turn fails"""
+        language = user_data.get('learningLanguage', 'English') if user_data else 'English'
+        error_message = get_error_message(language)
+        audio_id = None
+        
+        if user_data:
+            # Pre-rendered at startup: TTS may be what just failed
+            try:
+                audio_id = get_canned_audio().get_id(error_message, language, audio_speed)
+            except Exception as e:
+                print(f"Error loading canned audio: {e}")
+        
+        return {
+            'response': error_message,
+            'intent': 'error',
+            'audio_language': language,
+            'audio_id': audio_id,
+            'error': str(error)
+        }
+    
+    def _load_user_and_intent(self, user_id, message_content):
+        user_data = find_user_by_id(user_id)
+        if not user_data:
+            raise ValueError("User not found")
+        
+        intent = self.detect_intent(
+            message_content, 
+            user_data['nativeLanguage'], 
+            user_data['learningLanguage']
+        )
+        return user_data, intent
+    
+    def generate_response(self, user_id, message_content, audio_speed=0.8, audio_format=DEFAULT_AUDIO_FORMAT):
         """Main method to generate chat response with persistent memory and audio"""
+        user_data = None
         try:
-            # Get user data
-            user_data = find_user_by_id(user_id)
-            if not user_data:
-                raise ValueError("User not found")
-            
-            # Detect intent
-            intent = self.detect_intent(
-                message_content, 
-                user_data['nativeLanguage'], 
-                user_data['learningLanguage']
-            )
+            # Get user data and detect intent
+            user_data, intent = self._load_user_and_intent(user_id, message_content)
             
             # For now, only handle chat mode
             if intent == 'teaching':
-                # TODO: Route to teaching service
-                response_text = f"I detected you need help! For now, I'll continue chatting in {user_data['learningLanguage']}. Teaching mode coming soon!"
-                audio_data = self.generate_audio(response_text, user_data['learningLanguage'], audio_speed)
-                
-                return {
-                    'response': response_text,
-                    'intent': 'teaching',
-                    'audio_language': user_data['learningLanguage'],
-                    'audio_data': audio_data
-                }
-            
-            # Add user message to persistent conversation
-            self.conversation_service.add_message(
-                user_id, message_content, 'user', intent, user_data['learningLanguage']
-            )
+                return self._teaching_result(user_data, audio_speed)
             
-            # Get conversation context for prompt
-            conversation_context = self.conversation_service.get_conversation_context(user_id)
+            # The conversation lock is held only while reading and writing
+            # the document, never across the OpenAI call
+            turn = self.conversation_service.begin_turn(user_id)
+            with turn:
+                # Add user message to persistent conversation
+                turn.add_message(message_content, 'user', intent, user_data['learningLanguage'])
+                context = turn.get_context()
             
             # Build prompt with enhanced context
-            prompt = self.build_chat_prompt(user_data, conversation_context, message_content)
+            messages, prompt_tokens = self.build_chat_prompt(user_data, context, message_content)
             
             # Call OpenAI
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": message_content}
-                ],
-                temperature=0.3,  # Low creativity for consistency
-                max_tokens=150,   # Keep responses brief
-            )
-            
+            response = self._chat_completion(messages)
             bot_response_content = response.choices[0].message.content.strip()
             
-            # Generate audio for the response
-            audio_data = self.generate_audio(
+            # Add bot response to persistent conversation
+            with turn:
+                bot_message = turn.add_message(bot_response_content, 'bot', 'chat', user_data['learningLanguage'])
+            
+            # Generate audio for the response (outside the conversation lock)
+            audio_id = self.generate_audio(
                 bot_response_content, 
                 user_data['learningLanguage'],
-                audio_speed
-            )
-            
-            # Add bot response to persistent conversation
-            self.conversation_service.add_message(
-                user_id, bot_response_content, 'bot', 'chat', user_data['learningLanguage']
+                audio_speed,
+                audio_format
             )
             
             return {
                 'response': bot_response_content,
                 'intent': 'chat',
                 'audio_language': user_data['learningLanguage'],
-                'audio_data': audio_data
+                'audio_id': audio_id,
+                'message_id': bot_message['id'],
+                'prompt_tokens': prompt_tokens
             }
             
         except Exception as e:
             # Graceful error handling
-            error_message = get_error_message(user_data.get('learningLanguage', 'English') if user_data else 'English')
-            audio_data = None
+            return self._error_result(user_data, audio_speed, e)
+    
+    def _speech_pipeline(self, language, audio_speed, audio_format=DEFAULT_AUDIO_FORMAT):
+        """Sentence-by-sentence TTS running on the shared worker pool"""
+        self._resolve_audio_resources()
+        return SpeechPipeline(
+            lambda sentence: self.generate_audio(sentence, language, audio_speed, audio_format),
+            get_tts_executor(current_app.config.get('TTS_PIPELINE_WORKERS', 4))
+        )
+    
+    def stream_response(self, user_id, message_content, audio_speed=0.8, audio_format=DEFAULT_AUDIO_FORMAT):
+        """
+        Streaming variant of generate_response.
+        Yields (event, data) pairs: 'token' for each text delta as OpenAI
+        produces it, 'audio' for each sentence's audio in sentence order
+        (synthesized while the rest of the reply is still generating), then
+        'done' with the generate_response payload (audio_id is None, the
+        audio went out as audio_chunks 'audio' events), or 'error' with the
+        error payload. The conversation lock is held only to save the user
+        message and, once the text stream completes, the bot message; if
+        the client disconnects early only the user message is saved.
+        """
+        user_data = None
+        pipeline = None
+        try:
+            user_data, intent = self._load_user_and_intent(user_id, message_content)
+            
+            if intent == 'teaching':
+                result = self._teaching_result(user_data, audio_speed)
+                yield 'token', {'text': result['response']}
+                yield 'done', result
+                return
             
-            if user_data:
-                try:
-                    audio_data = self.generate_audio(
-                        error_message, 
-                        user_data.get('learningLanguage', 'English'),
-                        audio_speed
-                    )
-                except:
-                    pass
+            pipeline = self._speech_pipeline(user_data['learningLanguage'], audio_speed, audio_format)
             
-            return {
-                'response': error_message,
-                'intent': 'error',
-                'audio_language': user_data.get('learningLanguage', 'English') if user_data else 'English',
-                'audio_data': audio_data,
-                'error': str(e)
+            turn = self.conversation_service.begin_turn(user_id)
+            with turn:
+                turn.add_message(message_content, 'user', intent, user_data['learningLanguage'])
+                context = turn.get_context()
+            messages, prompt_tokens = self.build_chat_prompt(user_data, context, message_content)
+            
+            # No conversation lock while streaming: the client sets the pace
+            parts = []
+            for chunk in self._chat_completion(messages, stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield 'token', {'text': delta}
+                    pipeline.feed(delta)
+                    for audio_chunk in pipeline.ready():
+                        yield 'audio', audio_chunk
+            
+            bot_response_content = ''.join(parts).strip()
+            with turn:
+                bot_message = turn.add_message(bot_response_content, 'bot', 'chat', user_data['learningLanguage'])
+            
+            for audio_chunk in pipeline.finish():
+                yield 'audio', audio_chunk
+            
+            yield 'done', {
+                'response': bot_response_content,
+                'intent': 'chat',
+                'audio_language': user_data['learningLanguage'],
+                'audio_id': None,
+                'audio_chunks': pipeline.chunk_count,
+                'message_id': bot_message['id'],
+                'prompt_tokens': prompt_tokens
             }
+            
+        except Exception as e:
+            yield 'error', self._error_result(user_data, audio_speed, e)
+        finally:
+            if pipeline:
+                pipeline.cancel()
+    
+    def generate_message_audio(self, user_id, message, audio_speed=0.8, audio_format=DEFAULT_AUDIO_FORMAT):
+        """Audio id for a stored message at the given speed"""
+        language = message.get('audio_language') or find_user_by_id(user_id)['learningLanguage']
+        return self.generate_speed_variant(message['content'], language, audio_speed, audio_format)
     
     def get_conversation_history(self, user_id):
         """Get conversation history using persistent storage"""
         return self.conversation_service.get_conversation_history(user_id)
     
     def start_new_session(self, user_id):
-        """Start new conversation session and clear audio cache"""
-        # Clear audio cache for this session
-        self._audio_cache.clear()
-        
+        """Start new conversation session"""
+        # The audio cache is shared by all users and bounded on its own,
+        # so it is not cleared here
         self.conversation_service.start_new_session(user_id)
         return {"message": "New session started"}
\ No newline at end of file
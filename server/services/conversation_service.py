@@ -1,11 +1,103 @@
 import openai
 from flask import current_app
 from datetime import datetime
+from threading import Lock
 from ..utils.conversation_utils import (
     load_user_conversations, save_user_conversations, add_message_to_conversation,
     get_recent_messages, should_summarize_conversation, get_current_conversation,
-    start_new_conversation
+    get_conversation, start_new_conversation, user_conversations_lock, set_conversation_summary,
+    get_summary_mark, find_message
 )
+from ..utils.job_queue import JobQueue
+
+_summary_queue = None
+_summary_queue_lock = Lock()
+
+def get_summary_queue():
+    """Process-wide background queue for conversation summaries"""
+    global _summary_queue
+    with _summary_queue_lock:
+        if _summary_queue is None:
+            _summary_queue = JobQueue(
+                'summary',
+                workers=current_app.config.get('SUMMARY_WORKERS', 2),
+                max_retries=current_app.config.get('SUMMARY_MAX_RETRIES', 3),
+                backoff_ms=current_app.config.get('SUMMARY_RETRY_BACKOFF_MS', 1000)
+            )
+        return _summary_queue
+
+def get_summary_queue_stats():
+    """Depth and counters of the summary queue (empty before first use)"""
+    if _summary_queue is None:
+        return {'depth': 0, 'running': 0, 'completed': 0, 'retried': 0, 'failed': 0}
+    return _summary_queue.stats()
+
+def close_summary_queue(timeout=5.0):
+    """Let queued summaries finish before shutdown"""
+    if _summary_queue is not None:
+        _summary_queue.close(timeout)
+
+class ConversationTurn:
+    """
+    Unit of work for one chat turn.
+
+    Each `with turn:` block is one short critical section: it takes the
+    user's conversation lock, loads the conversations document, lets the
+    caller add messages and read prompt context from memory, then saves
+    once on exit and queues a background summary if one is due. A turn
+    uses two blocks, one for the user message and one for the bot
+    message, and calls the model between them with no lock held; the
+    second block reloads the document, so writes made in between (the
+    summary job, another tab) are kept.
+    Messages added before an exception are still saved, matching the old
+    behaviour of persisting the user message even if the reply fails.
+    """
+    
+    def __init__(self, service, user_id):
+        self.service = service
+        self.user_id = user_id
+        self.conversations_data = None
+        self._lock = None
+        self._dirty = False
+        self._bot_replied = False
+    
+    def __enter__(self):
+        lock = user_conversations_lock(self.user_id)
+        lock.__enter__()
+        try:
+            self.conversations_data = load_user_conversations(self.user_id)
+        except BaseException:
+            lock.__exit__(None, None, None)
+            raise
+        self._lock = lock
+        self._dirty = False
+        self._bot_replied = False
+        return self
+    
+    def add_message(self, message_content, sender, intent=None, audio_language=None):
+        """Add a message to the current conversation (saved on exit); returns it"""
+        message = self.service._append_message(
+            self.conversations_data, message_content, sender, intent, audio_language
+        )
+        self._dirty = True
+        if sender == 'bot':  # Summarize after bot responses
+            self._bot_replied = True
+        return message
+    
+    def get_context(self):
+        """Get prompt context from the already loaded conversations"""
+        return self.service._build_context(self.conversations_data)
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._dirty:
+                save_user_conversations(self.user_id, self.conversations_data)
+                if self._bot_replied:
+                    self.service._summarize_if_needed(self.user_id, self.conversations_data)
+        finally:
+            lock, self._lock = self._lock, None
+            lock.__exit__(exc_type, exc, tb)
+        return False
 
 class ConversationService:
     def __init__(self):
@@ -21,46 +113,57 @@ class ConversationService:
             self._openai_client = openai.OpenAI(api_key=api_key)
         return self._openai_client
     
-    def generate_conversation_summary(self, messages):
-        """Generate a summary of conversation messages using GPT-4"""
-        try:
-            # Prepare messages for summarization
-            conversation_text = "\n".join([
-                f"{msg['sender']}: {msg['content']}" for msg in messages
-            ])
-            
-            summary_prompt = f"""Please create a concise bullet-point summary of this conversation between a language learner and AI tutor. Focus on:
-- Key personal information shared by the user
+    def _request_summary(self, messages, previous_summary=''):
+        """
+        Ask GPT-4 for a bullet-point summary (raises on failure).
+        With a previous summary only the new messages are sent and the
+        model folds them into it, so the cost stays flat as the
+        conversation grows.
+        """
+        # Prepare messages for summarization
+        conversation_text = "\n".join([
+            f"{msg['sender']}: {msg['content']}" for msg in messages
+        ])
+        
+        focus = """- Key personal information shared by the user
 - Topics discussed
 - Language learning progress or challenges
-- Important facts to remember for future conversations
+- Important facts to remember for future conversations"""
+        
+        if previous_summary:
+            summary_prompt = f"""Here is the summary so far of a conversation between a language learner and AI tutor, followed by the messages exchanged since. Update the summary so it also covers the new messages, keeping earlier facts unless they were corrected. Focus on:
+{focus}
+
+Summary so far:
+{previous_summary}
+
+New messages:
+{conversation_text}
+
+Provide the updated summary as bullet points:"""
+        else:
+            summary_prompt = f"""Please create a concise bullet-point summary of this conversation between a language learner and AI tutor. Focus on:
+{focus}
 
 Conversation:
 {conversation_text}
 
 Provide the summary as bullet points:"""
 
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates concise conversation summaries."},
-                    {"role": "user", "content": summary_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=200
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            print(f"Error generating summary: {e}")
-            return "Summary unavailable"
-    
-    def add_message(self, user_id, message_content, sender, intent=None, audio_language=None):
-        """Add a message to user's conversation and handle summarization"""
-        # Load user conversations
-        conversations_data = load_user_conversations(user_id)
+        response = self.openai_client.chat.completions.create(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that creates concise conversation summaries."},
+                {"role": "user", "content": summary_prompt}
+            ],
+            temperature=0.3,
+            max_tokens=200
+        )
         
+        return response.choices[0].message.content.strip()
+    
+    def _append_message(self, conversations_data, message_content, sender, intent=None, audio_language=None):
+        """Append a message to the loaded conversations document"""
         # Create message data (ID will be generated in add_message_to_conversation)
         message_data = {
             'content': message_content,
@@ -71,25 +174,66 @@ Provide the summary as bullet points:"""
         }
         
         # Add message to conversation (this will generate the proper ID)
-        conversations_data = add_message_to_conversation(conversations_data, message_data)
-        
-        # Check if we need to summarize
-        if should_summarize_conversation(conversations_data) and sender == 'bot':  # Summarize after bot responses
+        add_message_to_conversation(conversations_data, message_data)
+        return message_data
+    
+    def _summarize_if_needed(self, user_id, conversations_data):
+        """Queue a summary update every few user messages (never blocks the turn)"""
+        if should_summarize_conversation(conversations_data):
             current_conv = get_current_conversation(conversations_data)
-            if current_conv and not current_conv.get('summary'):
-                print(f"Generating summary for conversation {current_conv['id']}")
-                summary = self.generate_conversation_summary(current_conv['messages'])
-                current_conv['summary'] = summary
-        
-        # Save conversations
-        save_user_conversations(user_id, conversations_data)
-        
-        return conversations_data
+            if current_conv:
+                self.schedule_summary(user_id, current_conv['id'])
     
-    def get_conversation_context(self, user_id):
-        """Get conversation context for prompt building"""
-        conversations_data = load_user_conversations(user_id)
+    def schedule_summary(self, user_id, conversation_id):
+        """Summarize a conversation in the background (deduplicated per conversation)"""
+        app = current_app._get_current_object()
+        return get_summary_queue().submit(
+            (user_id, conversation_id), self._run_summary_job, app, user_id, conversation_id
+        )
+    
+    def _run_summary_job(self, app, user_id, conversation_id):
+        """
+        Rolling summary job: under the user's lock, take the previous
+        summary and the messages past its high-water mark; call the model
+        without holding the lock; then store the new summary and mark under
+        the lock. Raises on model errors so the queue retries it.
+        """
+        with app.app_context():
+            with user_conversations_lock(user_id):
+                conv = get_conversation(load_user_conversations(user_id), conversation_id)
+                if not conv:
+                    return
+                previous_summary = conv.get('summary', '')
+                mark = get_summary_mark(conv)
+                new_messages = conv['messages'][mark:]
+                if not new_messages:
+                    return
+                new_mark = mark + len(new_messages)
+            
+            print(f"Updating summary for conversation {conversation_id} ({len(new_messages)} new messages)")
+            summary = self._request_summary(new_messages, previous_summary if mark else '')
+            
+            with user_conversations_lock(user_id):
+                conversations_data = load_user_conversations(user_id)
+                conv = get_conversation(conversations_data, conversation_id)
+                if not conv or get_summary_mark(conv) >= new_mark:  # Gone, or already newer
+                    return
+                set_conversation_summary(conv, summary, new_mark)
+                save_user_conversations(user_id, conversations_data)
+    
+    def add_message(self, user_id, message_content, sender, intent=None, audio_language=None):
+        """Add a message to user's conversation and handle summarization"""
+        with self.begin_turn(user_id) as turn:
+            turn.add_message(message_content, sender, intent, audio_language)
         
+        return turn.conversations_data
+    
+    def begin_turn(self, user_id):
+        """Open a unit of work that loads the conversations once and saves once"""
+        return ConversationTurn(self, user_id)
+    
+    def _build_context(self, conversations_data):
+        """Build prompt context from a loaded conversations document"""
         # Get recent messages from current conversation
         recent_messages = get_recent_messages(conversations_data, limit=10)
         
@@ -107,10 +251,18 @@ Provide the summary as bullet points:"""
             'message_count': len(recent_messages)
         }
     
+    def get_conversation_context(self, user_id):
+        """Get conversation context for prompt building"""
+        return self._build_context(load_user_conversations(user_id))
+    
     def start_new_session(self, user_id):
         """Start a new conversation session"""
         return start_new_conversation(user_id)
     
+    def find_message(self, user_id, message_id):
+        """Get one of the user's stored messages by id"""
+        return find_message(load_user_conversations(user_id), message_id)
+    
     def get_conversation_history(self, user_id):
         """Get conversation history for display"""
         conversations_data = load_user_conversations(user_id)
@@ -0,0 +1,118 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+# A sentence ends at . ! ? (or the Devanagari danda and Arabic question
+# mark), optionally followed by closing quotes/brackets, then whitespace.
+# CJK text puts no space after 。！？, so those end a sentence as soon as
+# any more text follows.
+SENTENCE_END = re.compile(
+    r'(?<=[.!?।؟])["\'”’)\]]*\s+'
+    r'|(?<=[。！？])["\'”’)\]」』）]*\s*(?=\S)'
+)
+
+# Sentences shorter than this are merged into the next one so the TTS
+# service is not called for fragments like "Ja." or "Oh!"
+MIN_SENTENCE_CHARS = 12
+
+_executors = {}
+_executors_lock = Lock()
+
+def get_tts_executor(max_workers=4, name='tts'):
+    """
+    Process-wide worker pool for sentence synthesis. Work that waits on
+    other synthesis work uses its own name, so it never waits on a pool
+    it is occupying.
+    """
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        return executor
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """
+    text as a list of sentences, by the same rule the pipeline streams
+    with; sentences shorter than min_chars are merged into the next one
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        sentence = text[start:match.start()].strip()
+        if len(sentence) >= min_chars:
+            sentences.append(sentence)
+            start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+class SpeechPipeline:
+    """
+    Cuts a streamed reply into sentences and synthesizes each finished
+    sentence on a worker pool while the rest of the reply is still being
+    generated, so LLM and TTS time overlap instead of adding up.
+
+    Audio chunks are handed back strictly in sentence order: ready() only
+    returns the chunks whose predecessors are done, finish() waits for the
+    rest.
+    """
+
+    def __init__(self, synthesize, executor):
+        # synthesize(text) -> audio id or None; runs on the pool
+        self._synthesize = synthesize
+        self._executor = executor
+        self._buffer = ''
+        self._pending = []  # [(index, text, future)] in sentence order
+        self._next_index = 0
+
+    def _submit(self, sentence):
+        future = self._executor.submit(self._synthesize, sentence)
+        self._pending.append((self._next_index, sentence, future))
+        self._next_index += 1
+
+    def feed(self, text):
+        """Add streamed text and start synthesis for every finished sentence"""
+        self._buffer += text
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start:match.start()].strip()
+            if len(sentence) >= MIN_SENTENCE_CHARS:
+                self._submit(sentence)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+
+    def _chunk(self, index, text, future):
+        try:
+            audio_id = future.result()
+        except Exception as e:
+            print(f"Error synthesizing sentence {index}: {e}")
+            audio_id = None
+        return {'index': index, 'text': text, 'audio_id': audio_id}
+
+    def ready(self):
+        """Chunks that are done, in order, without blocking"""
+        chunks = []
+        while self._pending and self._pending[0][2].done():
+            chunks.append(self._chunk(*self._pending.pop(0)))
+        return chunks
+
+    def finish(self):
+        """Flush the trailing text and yield the remaining chunks in order"""
+        tail = self._buffer.strip()
+        self._buffer = ''
+        if tail:
+            self._submit(tail)
+        while self._pending:
+            yield self._chunk(*self._pending.pop(0))
+
+    def cancel(self):
+        """Drop sentences that have not started yet (client went away)"""
+        for _, _, future in self._pending:
+            future.cancel()
+        self._pending = []
+
+    @property
+    def chunk_count(self):
+        return self._next_index
@@ -0,0 +1,224 @@
+import threading
+import time
+from contextlib import contextmanager
+import azure.cognitiveservices.speech as speechsdk
+from flask import current_app
+
+# MP3 for smaller size and faster transmission
+DEFAULT_OUTPUT_FORMAT = speechsdk.SpeechSynthesisOutputFormat.Audio16Khz32KBitRateMonoMp3
+# 16-bit mono WAV, the source for local time stretching
+PCM_OUTPUT_FORMAT = speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm
+# Azure output format for each negotiable format (see utils/audio_formats.py)
+AZURE_OUTPUT_FORMATS = {
+    'mp3': DEFAULT_OUTPUT_FORMAT,
+    'webm-opus': speechsdk.SpeechSynthesisOutputFormat.Webm24Khz16Bit24KbpsMonoOpus,
+    'webm-opus-low': speechsdk.SpeechSynthesisOutputFormat.Webm16Khz16BitMonoOpus
+}
+
+
+class PooledSynthesizer:
+    """A SpeechSynthesizer bound to one voice and format, with its own open connection"""
+
+    def __init__(self, speech_key, speech_region, voice_name, output_format):
+        # Each synthesizer gets its own config, so no caller ever changes
+        # the voice under another one
+        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+        speech_config.speech_synthesis_voice_name = voice_name
+        speech_config.set_speech_synthesis_output_format(output_format)
+
+        self.voice_name = voice_name
+        self.output_format = output_format
+        # No audio config: audio data comes back in the result
+        self.synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        self.connection = speechsdk.Connection.from_speech_synthesizer(self.synthesizer)
+        self.connected = False
+        self.broken = False
+        self.last_used = time.monotonic()
+        self.connection.connected.connect(lambda _: self._set_connected(True))
+        self.connection.disconnected.connect(lambda _: self._set_connected(False))
+        self.open()
+
+    def _set_connected(self, connected):
+        self.connected = connected
+
+    def open(self):
+        """Open the service connection now instead of on the first speak call"""
+        self.connection.open(True)
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception as e:
+            print(f"Error closing synthesizer connection: {e}")
+
+    def speak_ssml(self, ssml_text):
+        self.last_used = time.monotonic()
+        return self.synthesizer.speak_ssml_async(ssml_text).get()
+
+
+class SynthesizerPool:
+    """
+    Azure synthesizers pooled by (voice, output format).
+
+    A synthesizer is checked out by one caller at a time and returned
+    afterwards, so concurrent requests never share one. Idle synthesizers
+    keep their connection open; on checkout one that was dropped by the
+    service or idle for too long is reopened, and one whose last call
+    failed is replaced. At most max_concurrency calls run per voice.
+    """
+
+    def __init__(self, speech_key, speech_region, max_idle_per_voice=4, max_concurrency=4,
+                 max_idle_seconds=300, checkout_timeout=30):
+        self.speech_key = speech_key
+        self.speech_region = speech_region
+        self.max_idle_per_voice = max_idle_per_voice
+        self.max_concurrency = max_concurrency
+        self.max_idle_seconds = max_idle_seconds
+        self.checkout_timeout = checkout_timeout
+        self._idle = {}        # (voice, format) -> [PooledSynthesizer]
+        self._semaphores = {}  # voice -> BoundedSemaphore
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._created = 0
+        self._reopened = 0
+        self._discarded = 0
+
+    def _semaphore(self, voice_name):
+        with self._lock:
+            semaphore = self._semaphores.get(voice_name)
+            if semaphore is None:
+                semaphore = self._semaphores[voice_name] = threading.BoundedSemaphore(self.max_concurrency)
+            return semaphore
+
+    def _create(self, voice_name, output_format):
+        synthesizer = PooledSynthesizer(self.speech_key, self.speech_region, voice_name, output_format)
+        with self._lock:
+            self._created += 1
+        return synthesizer
+
+    def _take_idle(self, key):
+        """A healthy idle synthesizer for key, or None"""
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                synthesizer = idle.pop()
+
+            stale = time.monotonic() - synthesizer.last_used > self.max_idle_seconds
+            if synthesizer.connected and not stale:
+                return synthesizer
+            try:
+                synthesizer.open()
+                with self._lock:
+                    self._reopened += 1
+                return synthesizer
+            except Exception as e:
+                print(f"Discarding synthesizer for {key[0]}: {e}")
+                self._discard(synthesizer)
+
+    def _discard(self, synthesizer):
+        synthesizer.close()
+        with self._lock:
+            self._discarded += 1
+
+    def _return(self, synthesizer):
+        key = (synthesizer.voice_name, synthesizer.output_format)
+        if synthesizer.broken:
+            self._discard(synthesizer)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_voice:
+                idle.append(synthesizer)
+                return
+        self._discard(synthesizer)
+
+    @contextmanager
+    def checkout(self, voice_name, output_format=DEFAULT_OUTPUT_FORMAT):
+        """
+        Exclusive use of a synthesizer for voice_name. Set broken on it (or
+        raise) to have it replaced instead of returned to the pool.
+        """
+        semaphore = self._semaphore(voice_name)
+        if not semaphore.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(f"No synthesizer available for {voice_name}")
+        try:
+            key = (voice_name, output_format)
+            synthesizer = self._take_idle(key) or self._create(voice_name, output_format)
+            with self._lock:
+                self._in_use += 1
+            try:
+                yield synthesizer
+            except Exception:
+                synthesizer.broken = True
+                raise
+            finally:
+                with self._lock:
+                    self._in_use -= 1
+                self._return(synthesizer)
+        finally:
+            semaphore.release()
+
+    def prewarm(self, voice_names, output_format=DEFAULT_OUTPUT_FORMAT):
+        """Open one connection per voice ahead of the first request"""
+        for voice_name in voice_names:
+            key = (voice_name, output_format)
+            with self._lock:
+                if self._idle.get(key):
+                    continue
+            try:
+                self._return(self._create(voice_name, output_format))
+            except Exception as e:
+                print(f"Error pre-opening synthesizer for {voice_name}: {e}")
+
+    def close(self):
+        with self._lock:
+            idle = [s for synthesizers in self._idle.values() for s in synthesizers]
+            self._idle = {}
+        for synthesizer in idle:
+            synthesizer.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'idle': sum(len(synthesizers) for synthesizers in self._idle.values()),
+                'in_use': self._in_use,
+                'created': self._created,
+                'reopened': self._reopened,
+                'discarded': self._discarded
+            }
+
+
+_synthesizer_pool = None
+_synthesizer_pool_lock = threading.Lock()
+
+def get_synthesizer_pool():
+    """Process-wide synthesizer pool; the first call needs an app context"""
+    global _synthesizer_pool
+    with _synthesizer_pool_lock:
+        if _synthesizer_pool is None:
+            speech_key = current_app.config.get('AZURE_SPEECH_KEY')
+            speech_region = current_app.config.get('AZURE_SPEECH_REGION')
+            if not speech_key or not speech_region:
+                raise ValueError("Azure Speech credentials not configured")
+            _synthesizer_pool = SynthesizerPool(
+                speech_key,
+                speech_region,
+                max_idle_per_voice=current_app.config.get('TTS_POOL_MAX_IDLE_PER_VOICE', 4),
+                max_concurrency=current_app.config.get('TTS_POOL_MAX_CONCURRENCY_PER_VOICE', 4),
+                max_idle_seconds=current_app.config.get('TTS_POOL_MAX_IDLE_SECONDS', 300),
+                checkout_timeout=current_app.config.get('TTS_POOL_CHECKOUT_TIMEOUT_SECONDS', 30)
+            )
+        return _synthesizer_pool
+
+def get_synthesizer_pool_stats():
+    """Counters of the synthesizer pool (None before first use)"""
+    if _synthesizer_pool is None:
+        return None
+    return _synthesizer_pool.stats()
+
+def close_synthesizer_pool():
+    """Close pooled connections at shutdown"""
+    if _synthesizer_pool is not None:
+        _synthesizer_pool.close()
@@ -0,0 +1,95 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from flask import current_app, has_app_context
+
+DEFAULT_AUDIO_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_whitespace = re.compile(r'\s+')
+
+def normalize_text(text):
+    """Canonical form of text for cache keys (NFC, collapsed whitespace)"""
+    return _whitespace.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+def audio_cache_key(text, voice_name, speed_rate, audio_format='mp3'):
+    """Fixed-size key over everything that changes the rendered audio"""
+    material = f"{voice_name}|{speed_rate:.2f}|{audio_format}|{normalize_text(text)}"
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """
+    Process-wide LRU of rendered audio bytes with a total byte budget.
+
+    Shared by all users and services, so one user's new session no longer
+    wipes everyone's hits; memory stays bounded by evicting the least
+    recently used renders.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0
+            }
+
+
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+def get_audio_cache():
+    """The shared audio cache, sized by AUDIO_CACHE_MAX_BYTES"""
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            # Also reached from TTS worker threads, which have no app context
+            config = current_app.config if has_app_context() else {}
+            _audio_cache = AudioCache(config.get('AUDIO_CACHE_MAX_BYTES', DEFAULT_AUDIO_CACHE_MAX_BYTES))
+        return _audio_cache
+
+def get_audio_cache_stats():
+    """Counters of the shared audio cache (empty before first use)"""
+    if _audio_cache is None:
+        return AudioCache(0).stats()
+    return _audio_cache.stats()
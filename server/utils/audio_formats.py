@@ -0,0 +1,83 @@
+"""
+Audio output formats and per-client negotiation.
+
+MP3 is the default: every browser plays it, and its frames can be joined,
+so replies are cached and stitched per sentence. Clients that can play
+WebM/Opus and report a constrained link get Opus at a lower bitrate
+instead, rendered whole since a WebM container cannot be concatenated.
+"""
+
+# extension: how the store names the file; stitchable: renders can be
+# joined byte-wise (see mp3_utils)
+AUDIO_FORMATS = {
+    'mp3': {'extension': 'mp3', 'mimetype': 'audio/mpeg', 'stitchable': True},       # 32 kbps
+    'webm-opus': {'extension': 'webm', 'mimetype': 'audio/webm', 'stitchable': False},  # 24 kbps
+    'webm-opus-low': {'extension': 'webm', 'mimetype': 'audio/webm', 'stitchable': False}  # 16 kHz, lowest
+}
+DEFAULT_AUDIO_FORMAT = 'mp3'
+
+# Effective connection types (ECT client hint) by the format they get
+_VERY_SLOW_CONNECTIONS = {'slow-2g', '2g'}
+_SLOW_CONNECTIONS = {'3g'}
+# Downlink client hint thresholds, in Mbps
+VERY_SLOW_DOWNLINK = 0.5
+SLOW_DOWNLINK = 2.0
+
+def get_audio_format(audio_format):
+    """Properties of a known format (the default for anything else)"""
+    return AUDIO_FORMATS.get(audio_format) or AUDIO_FORMATS[DEFAULT_AUDIO_FORMAT]
+
+def accepts_webm(accept):
+    """True if an Accept header lists audio/webm explicitly (wildcards don't count)"""
+    for media_range in (accept or '').split(','):
+        mimetype, *params = [part.strip() for part in media_range.split(';')]
+        if mimetype.lower() != 'audio/webm':
+            continue
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+def _link_class(headers):
+    """'very_slow', 'slow' or None from the Save-Data, ECT and Downlink hints"""
+    if (headers.get('Save-Data') or '').strip().lower() == 'on':
+        return 'very_slow'
+
+    connection_type = (headers.get('ECT') or '').strip().lower()
+    if connection_type in _VERY_SLOW_CONNECTIONS:
+        return 'very_slow'
+    if connection_type in _SLOW_CONNECTIONS:
+        return 'slow'
+
+    try:
+        downlink = float(headers.get('Downlink') or 'nan')
+    except ValueError:
+        return None
+    if downlink < VERY_SLOW_DOWNLINK:
+        return 'very_slow'
+    if downlink < SLOW_DOWNLINK:
+        return 'slow'
+    return None
+
+def negotiate_audio_format(requested, headers, enabled=AUDIO_FORMATS):
+    """
+    Output format for a request: a known audio_format the client asked
+    for, else Opus for clients that accept audio/webm on a constrained
+    link (by client hints), else MP3. enabled limits the choice.
+    """
+    if requested in AUDIO_FORMATS and requested in enabled:
+        return requested
+
+    if accepts_webm(headers.get('Accept')):
+        link = _link_class(headers)
+        if link == 'very_slow' and 'webm-opus-low' in enabled:
+            return 'webm-opus-low'
+        if link and 'webm-opus' in enabled:
+            return 'webm-opus'
+
+    return DEFAULT_AUDIO_FORMAT
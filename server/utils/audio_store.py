@@ -0,0 +1,217 @@
+"""
+Content-addressed on-disk audio store shared by all worker processes.
+
+A render lives at <root>/<ab>/<cd>/<key>.<format>, where key is a SHA-256
+over the SSML, voice and format, so the same utterance is stored once no
+matter which user, process or restart produced it. index.jsonl records
+each render's size and creation time for the disk budget; it is
+append-only and rewritten only when old renders are evicted. Every
+process reads the other processes' appends before checking the budget.
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+from flask import current_app, has_app_context
+
+from .lock_utils import atomic_write, interprocess_lock
+
+DEFAULT_AUDIO_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Stored formats and how they are served
+AUDIO_MIMETYPES = {'mp3': 'audio/mpeg', 'wav': 'audio/wav', 'webm': 'audio/webm'}
+
+def audio_store_key(ssml, voice_name, audio_format='mp3'):
+    """Content address of a render"""
+    return hashlib.sha256(f"{voice_name}|{audio_format}|{ssml}".encode('utf-8')).hexdigest()
+
+def derived_audio_key(source_key, transform):
+    """Address of audio computed locally from a stored render"""
+    return hashlib.sha256(f"{source_key}|{transform}".encode('utf-8')).hexdigest()
+
+
+class AudioStore:
+    def __init__(self, root, max_bytes=DEFAULT_AUDIO_STORE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(root, 'index.jsonl')
+        self._entries = None  # key -> (size, created)
+        self._bytes = 0
+        self._index_inode = None
+        self._index_offset = 0  # How much of index.jsonl is in _entries
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key, audio_format='mp3'):
+        return os.path.join(self.root, key[:2], key[2:4], f'{key}.{audio_format}')
+
+    def _render_lock(self, key):
+        """
+        Interprocess lock on the leaf directory of key (<ab>/<cd>.lock):
+        renders of different keys almost never share it, and the lock
+        files are bounded in number and never deleted, so no process can
+        lock a file another one has just unlinked
+        """
+        directory = os.path.dirname(self.path(key))
+        os.makedirs(directory, exist_ok=True)
+        return interprocess_lock(directory)
+
+    def _read_index(self, offset=0):
+        """Index records from offset on: ({key: (size, created)}, offset after them)"""
+        entries = {}
+        try:
+            with open(self.index_file, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # Torn last line
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries[record['key']] = (record['size'], record['created'])
+        except FileNotFoundError:
+            pass
+        return entries, offset
+
+    def _sync_index(self):
+        """
+        Add the index records appended since the last sync, by any
+        process, to the usage count; caller holds self._lock. An index
+        rewritten by an eviction is re-read whole.
+        """
+        try:
+            stat = os.stat(self.index_file)
+            inode, size = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            inode, size = None, 0
+        if self._entries is None or inode != self._index_inode or size < self._index_offset:
+            self._entries = {}
+            self._bytes = 0
+            self._index_inode = inode
+            self._index_offset = 0
+
+        entries, self._index_offset = self._read_index(self._index_offset)
+        for key, entry in entries.items():
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._bytes -= previous[0]
+            self._entries[key] = entry
+            self._bytes += entry[0]
+
+    def read(self, key, audio_format='mp3'):
+        """Stored bytes for key (read through mmap), or None"""
+        try:
+            with open(self.path(key, audio_format), 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key, audio_format='mp3'):
+        return os.path.exists(self.path(key, audio_format))
+
+    def find(self, key):
+        """(path, format) of the stored file for key in any format, or (None, None)"""
+        for audio_format in AUDIO_MIMETYPES:
+            path = self.path(key, audio_format)
+            if os.path.exists(path):
+                return path, audio_format
+        return None, None
+
+    def put(self, key, data, audio_format='mp3'):
+        """Store a render (no-op if another process already stored it)"""
+        path = self.path(key, audio_format)
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, data)
+
+        record = {'key': key, 'size': len(data), 'created': time.time()}
+        with interprocess_lock(self.index_file):
+            with open(self.index_file, 'ab') as f:
+                f.write(json.dumps(record).encode('utf-8') + b'\n')
+            # Usage across all processes, not just this one's writes
+            with self._lock:
+                self._sync_index()
+                over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+        return path
+
+    def get_or_render(self, key, render, audio_format='mp3'):
+        """
+        Stored bytes for key, calling render() at most once across threads
+        and processes on a miss. render returns bytes or None.
+        """
+        data = self.read(key, audio_format)
+        if data is not None:
+            return data
+        # Per leaf directory, so a slow render never holds up renders of other keys
+        with self._render_lock(key):
+            # Another worker may have rendered it while we waited
+            data = self.read(key, audio_format)
+            if data is not None:
+                return data
+            data = render()
+            if data:
+                self.put(key, data, audio_format)
+            return data
+
+    def evict(self, target_ratio=0.9):
+        """
+        Delete the oldest renders until the store is under budget, by the
+        shared index (so renders of every process count)
+        """
+        with interprocess_lock(self.index_file):
+            entries, _ = self._read_index()
+            total = sum(size for size, _ in entries.values())
+            target = self.max_bytes * target_ratio
+            for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+                if total <= target:
+                    break
+                # The render in whichever format it was stored
+                for audio_format in AUDIO_MIMETYPES:
+                    try:
+                        os.remove(self.path(key, audio_format))
+                    except FileNotFoundError:
+                        pass
+                del entries[key]
+                total -= size
+
+            atomic_write(self.index_file, b''.join(
+                json.dumps({'key': key, 'size': size, 'created': created}).encode('utf-8') + b'\n'
+                for key, (size, created) in entries.items()
+            ))
+
+            with self._lock:
+                self._entries = None  # Re-read from the rewritten index
+                self._sync_index()
+
+    def stats(self):
+        with self._lock:
+            self._sync_index()
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+_audio_store = None
+_audio_store_lock = threading.Lock()
+
+def get_audio_store():
+    """The shared audio store under DATA_DIR/audio/store"""
+    global _audio_store
+    with _audio_store_lock:
+        if _audio_store is None:
+            # Also reached from TTS worker threads, which have no app context
+            config = current_app.config if has_app_context() else {}
+            data_dir = config.get('DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
+            _audio_store = AudioStore(
+                os.path.join(data_dir, 'audio', 'store'),
+                config.get('AUDIO_STORE_MAX_BYTES', DEFAULT_AUDIO_STORE_MAX_BYTES)
+            )
+        return _audio_store
@@ -0,0 +1,105 @@
+"""
+Compact msgspec encoders/decoders for the users and conversation stores.
+
+Decoding goes through the typed schemas in models/schemas.py, so a record
+is parsed and validated in one pass; results are handed back as the
+plain dicts the rest of the code works with.
+"""
+import msgspec
+
+from ..models.schemas import (
+    User, UserJournalRecord, ConversationHeader, ConversationDocument, ConversationLogRecord
+)
+
+DecodeError = (msgspec.DecodeError, msgspec.ValidationError)
+
+_encoder = msgspec.json.Encoder()
+_users_decoder = msgspec.json.Decoder()
+_journal_decoder = msgspec.json.Decoder(UserJournalRecord)
+_header_decoder = msgspec.json.Decoder(ConversationHeader)
+_document_decoder = msgspec.json.Decoder(ConversationDocument)
+_log_decoder = msgspec.json.Decoder(ConversationLogRecord)
+
+
+def _conversation_to_dict(conv):
+    """Struct -> dict, leaving out optional fields that were never set"""
+    return {key: value for key, value in msgspec.structs.asdict(conv).items() if value is not None}
+
+
+# ---- users ----
+
+def validate_user(user_data):
+    """Raise msgspec.ValidationError if user_data does not match the User schema"""
+    msgspec.convert(user_data, User)
+
+def decode_users(buf):
+    """
+    Decode a users.json snapshot. Decoded schemaless so fields added to
+    user records ahead of the User schema are never dropped.
+    """
+    return _users_decoder.decode(buf)
+
+def encode_users(users_data, indent=2):
+    """Encode a users.json snapshot (pretty-printed; it is written rarely)"""
+    return msgspec.json.format(_encoder.encode(users_data), indent=indent)
+
+def decode_journal_record(line):
+    return _journal_decoder.decode(line)
+
+def encode_journal_record(record):
+    return _encoder.encode(record) + b'\n'
+
+
+# ---- conversations ----
+
+def decode_header(buf):
+    header = _header_decoder.decode(buf)
+    return {
+        'user_id': header.user_id,
+        'current_conversation_id': header.current_conversation_id,
+        'conversations': [_conversation_to_dict(conv) for conv in header.conversations],
+        'message_counts': header.message_counts
+    }
+
+def encode_header(header):
+    return _encoder.encode(header)
+
+def decode_document(buf):
+    """Decode a whole conversations document (legacy <user_id>.json)"""
+    document = _document_decoder.decode(buf)
+    conversations = []
+    for conv in document.conversations:
+        conv_dict = _conversation_to_dict(conv)
+        conv_dict['messages'] = [msgspec.structs.asdict(msg) for msg in conv.messages]
+        conversations.append(conv_dict)
+    return {
+        'user_id': document.user_id,
+        'conversations': conversations,
+        'current_conversation_id': document.current_conversation_id
+    }
+
+def encode_document(conversations_data):
+    return _encoder.encode(conversations_data)
+
+def decode_log(buf):
+    """
+    Decode a JSONL message log into (conversation_id, message dict) pairs.
+    Falls back to line-by-line decoding, skipping torn or invalid lines,
+    if the fast whole-buffer pass fails.
+    """
+    try:
+        records = _log_decoder.decode_lines(buf)
+    except DecodeError:
+        records = []
+        for line in buf.splitlines():
+            try:
+                records.append(_log_decoder.decode(line))
+            except DecodeError:
+                continue
+    return [(record.conversation_id, msgspec.structs.asdict(record.message)) for record in records]
+
+def encode_log_records(conversation_id, messages):
+    return b''.join(
+        _encoder.encode({'conversation_id': conversation_id, 'message': message}) + b'\n'
+        for message in messages
+    )
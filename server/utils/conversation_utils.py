@@ -1,53 +1,474 @@
-import json
 import os
-from threading import Lock
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from flask import current_app
 from datetime import datetime
 import uuid
 import time
+from .lock_utils import user_lock, interprocess_lock, atomic_write
+from .codecs import (
+    DecodeError, decode_header, encode_header, decode_log, encode_log_records, decode_document
+)
 
-# File lock for conversation operations
-conversation_lock = Lock()
+# Storage layout per user inside DATA_DIR/conversations:
+#   <user_id>.jsonl        append-only message log, one
+#                          {"conversation_id": ..., "message": {...}} per line
+#   <user_id>.header.json  small side header: current conversation id,
+#                          conversation metadata (summary, created_at, ...)
+#                          and how many messages of each conversation are
+#                          already in the log
+#   <user_id>.json         legacy single-document format, migrated on first load
+HEADER_SUFFIX = '.header.json'
+LOG_SUFFIX = '.jsonl'
+MIGRATED_SUFFIX = '.migrated'
 
-def get_user_conversations_file(user_id):
-    """Get the conversation file path for a user"""
+def get_conversations_dir():
+    """Get the directory holding all conversation files"""
     conversations_dir = os.path.join(current_app.config['DATA_DIR'], 'conversations')
     os.makedirs(conversations_dir, exist_ok=True)
-    return os.path.join(conversations_dir, f'{user_id}.json')
+    return conversations_dir
+
+def get_user_conversations_file(user_id):
+    """Get the legacy single-document conversation file path for a user"""
+    return os.path.join(get_conversations_dir(), f'{user_id}.json')
+
+def get_user_conversation_header_file(user_id):
+    """Get the conversation header file path for a user"""
+    return os.path.join(get_conversations_dir(), f'{user_id}{HEADER_SUFFIX}')
+
+def get_user_conversation_log_file(user_id):
+    """Get the append-only message log path for a user"""
+    return os.path.join(get_conversations_dir(), f'{user_id}{LOG_SUFFIX}')
+
+def _get_user_lock_path(user_id):
+    """Base path of the cross-process lock file for a user's conversations"""
+    return os.path.join(get_conversations_dir(), user_id)
+
+@contextmanager
+def user_conversations_lock(user_id):
+    """
+    Exclusive lock on a user's conversation files, both against other
+    threads (striped user lock) and other worker processes (fcntl).
+    Hold it across load-modify-save so no turn is lost.
+    """
+    with user_lock(user_id), interprocess_lock(_get_user_lock_path(user_id)):
+        yield
+
+def _empty_conversations(user_id):
+    return {
+        'user_id': user_id,
+        'conversations': [],
+        'current_conversation_id': None
+    }
+
+def _read_header(user_id):
+    """
+    Read the side header, or None if the user has no header yet. A corrupt
+    header is rebuilt from the log and written back; caller holds the
+    user's lock (shared is enough: the rebuilt header depends only on the
+    log, which is only appended to under the exclusive lock).
+    """
+    header_file = get_user_conversation_header_file(user_id)
+    try:
+        with open(header_file, 'rb') as f:
+            return decode_header(f.read())
+    except FileNotFoundError:
+        return None
+    except DecodeError:
+        print(f"Corrupt conversation header for user {user_id}, rebuilding from log")
+        header = _header_from_log(user_id)
+        try:
+            _write_header(user_id, header)
+        except Exception as e:
+            print(f"Error rewriting conversation header for user {user_id}: {e}")
+        return header
+
+def _header_from_log(user_id):
+    """
+    Header recovered from the message log alone: one conversation per
+    conversation id, in log order, created at its first message, with the
+    conversation holding the newest message as the current one. Summaries
+    and topics are lost; counters are backfilled on the next turn.
+    """
+    messages_by_conversation = _read_log(user_id)
+    conversations = [
+        {'id': conversation_id, 'user_id': user_id, 'created_at': messages[0]['timestamp'], 'summary': ''}
+        for conversation_id, messages in messages_by_conversation.items()
+    ]
+    current_conversation_id = None
+    if messages_by_conversation:
+        current_conversation_id = max(
+            messages_by_conversation,
+            key=lambda conversation_id: messages_by_conversation[conversation_id][-1]['timestamp']
+        )
+    return {
+        'user_id': user_id,
+        'current_conversation_id': current_conversation_id,
+        'conversations': conversations,
+        'message_counts': {
+            conversation_id: len(messages) for conversation_id, messages in messages_by_conversation.items()
+        }
+    }
+
+def _write_header(user_id, header):
+    """Atomically replace the side header"""
+    atomic_write(get_user_conversation_header_file(user_id), encode_header(header))
+
+def _read_log(user_id):
+    """Read the message log grouped by conversation id, in order of first appearance"""
+    messages_by_conversation = {}
+    log_file = get_user_conversation_log_file(user_id)
+    try:
+        with open(log_file, 'rb') as f:
+            buf = f.read()
+    except FileNotFoundError:
+        return messages_by_conversation
+    # Torn writes from a crash mid-append are skipped by the decoder
+    for conversation_id, message in decode_log(buf):
+        messages_by_conversation.setdefault(conversation_id, []).append(message)
+    return messages_by_conversation
+
+def _append_log(user_id, data):
+    """Append log records, making sure we never continue a torn line"""
+    log_file = get_user_conversation_log_file(user_id)
+    with open(log_file, 'a+b') as f:
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                data = b'\n' + data
+        f.write(data)
+
+def _build_header(conversations_data, message_counts):
+    return {
+        'user_id': conversations_data['user_id'],
+        'current_conversation_id': conversations_data.get('current_conversation_id'),
+        'conversations': [
+            {key: value for key, value in conv.items() if key != 'messages'}
+            for conv in conversations_data.get('conversations', [])
+        ],
+        'message_counts': message_counts
+    }
+
+def _write_full(user_id, conversations_data):
+    """Rewrite both log and header from a complete conversations document"""
+    records = []
+    message_counts = {}
+    for conv in conversations_data.get('conversations', []):
+        records.append(encode_log_records(conv['id'], conv['messages']))
+        message_counts[conv['id']] = len(conv['messages'])
+    atomic_write(get_user_conversation_log_file(user_id), b''.join(records))
+    _write_header(user_id, _build_header(conversations_data, message_counts))
+
+def migrate_user_conversations(user_id):
+    """
+    Convert a legacy <user_id>.json document to the header + log format.
+    The legacy file is kept as <user_id>.json.migrated.
+    Returns the migrated conversations data, or None if there was nothing to migrate.
+    """
+    legacy_file = get_user_conversations_file(user_id)
+    with user_conversations_lock(user_id):
+        if not os.path.exists(legacy_file) or os.path.exists(get_user_conversation_header_file(user_id)):
+            return None
+        try:
+            with open(legacy_file, 'rb') as f:
+                conversations_data = decode_document(f.read())
+        except DecodeError:
+            print(f"Skipping migration of unreadable conversations for user {user_id}")
+            return None
+        _write_full(user_id, conversations_data)
+        os.replace(legacy_file, f'{legacy_file}{MIGRATED_SUFFIX}')
+    return conversations_data
+
+def _assemble_conversations(user_id, header):
+    """Join header metadata with the message log; returns (data, message_counts)"""
+    messages_by_conversation = _read_log(user_id)
+    conversations = []
+    for conv_meta in header.get('conversations', []):
+        conv = dict(conv_meta)
+        conv['messages'] = messages_by_conversation.get(conv['id'], [])
+        conversations.append(conv)
+    
+    conversations_data = {
+        'user_id': header.get('user_id', user_id),
+        'conversations': conversations,
+        'current_conversation_id': header.get('current_conversation_id')
+    }
+    message_counts = {conv['id']: len(conv['messages']) for conv in conversations}
+    return conversations_data, message_counts
+
+def _read_signature(user_id):
+    """Cheap stat-based fingerprint of a user's conversation files"""
+    signature = []
+    for path in (get_user_conversation_header_file(user_id), get_user_conversation_log_file(user_id)):
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def _estimate_size(conversations_data):
+    """Rough in-memory byte size of a conversations document"""
+    size = 256
+    for conv in conversations_data.get('conversations', []):
+        size += 256 + len(conv.get('summary') or '')
+        for msg in conv['messages']:
+            size += 160 + len(msg.get('content') or '')
+    return size
+
+
+class ConversationCache:
+    """
+    Bounded LRU of parsed conversation documents keyed by user.
+
+    Clean entries are revalidated against a stat fingerprint of the
+    user's files, so edits from other processes are noticed without
+    re-reading them. In write-behind mode saves only mark the entry dirty;
+    a background flusher writes dirty documents every flush_interval_ms
+    (coalescing all turns since the last flush) and on shutdown. A crash
+    can lose up to one interval of messages, so write-through is the
+    default and write-behind is meant for single-process deployments.
+    """
+    
+    def __init__(self, max_bytes, write_behind=False, flush_interval_ms=1000):
+        self.max_bytes = max_bytes
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+    
+    def get(self, key, signature):
+        """Return the cached document, or None if absent or stale on disk"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        # Stat outside the cache lock; dirty entries are newer than disk
+        if not entry['dirty'] and entry['signature'] != signature():
+            self.discard(key)
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return entry['data']
+    
+    def put(self, key, user_id, conversations_data, signature, dirty=False):
+        """
+        Cache a document; dirty documents are written by the flusher.
+        Returns the cached document: a clean put (a reader caching what it
+        read from disk) never replaces a dirty one, which is newer.
+        """
+        size = _estimate_size(conversations_data)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not dirty and entry is not None and entry['dirty']:
+                self._entries.move_to_end(key)
+                return entry['data']
+            self._remove(key)
+            self._entries[key] = {
+                'user_id': user_id,
+                'data': conversations_data,
+                'size': size,
+                'dirty': dirty,
+                'signature': signature,
+                'app': current_app._get_current_object()
+            }
+            self._size += size
+            self._evict()
+        if dirty:
+            self._ensure_flusher()
+        return conversations_data
+    
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry['size']
+    
+    def _evict(self):
+        """
+        Drop least recently used clean entries until under budget. Dirty
+        entries are skipped rather than written here (that would take
+        another user's lock while the caller holds its own); they become
+        evictable after the next flush.
+        """
+        if self._size <= self.max_bytes:
+            return
+        for key in list(self._entries):
+            if self._size <= self.max_bytes or len(self._entries) <= 1:
+                break
+            if not self._entries[key]['dirty']:
+                self._remove(key)
+    
+    def _write_entry(self, entry):
+        with entry['app'].app_context():
+            user_id = entry['user_id']
+            with user_conversations_lock(user_id):
+                if _write_conversations(user_id, entry['data']):
+                    entry['dirty'] = False
+                    entry['signature'] = _read_signature(user_id)
+    
+    def flush(self):
+        """Write every dirty document to disk"""
+        with self._lock:
+            dirty = [entry for entry in self._entries.values() if entry['dirty']]
+        for entry in dirty:
+            try:
+                self._write_entry(entry)
+            except Exception as e:
+                print(f"Error flushing conversations for user {entry['user_id']}: {e}")
+        with self._lock:
+            self._evict()
+    
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(
+                        target=self._run_flusher, name='conversation-flusher', daemon=True
+                    )
+                    self._flusher.start()
+    
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def close(self):
+        """Stop the flusher and write out everything still dirty"""
+        self._stop.set()
+        self.flush()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'dirty': sum(1 for entry in self._entries.values() if entry['dirty'])
+            }
+
+
+# Shared by all requests in this process; built from config on first use
+_conversation_cache = None
+_conversation_cache_lock = threading.Lock()
+
+def get_conversation_cache():
+    """Get the process-wide conversation cache, or None if disabled"""
+    global _conversation_cache
+    max_bytes = current_app.config.get('CONVERSATION_CACHE_MAX_BYTES', 0)
+    if not max_bytes:
+        return None
+    if _conversation_cache is None:
+        with _conversation_cache_lock:
+            if _conversation_cache is None:
+                _conversation_cache = ConversationCache(
+                    max_bytes,
+                    write_behind=current_app.config.get('CONVERSATION_WRITE_MODE') == 'write_behind',
+                    flush_interval_ms=current_app.config.get('CONVERSATION_FLUSH_INTERVAL_MS', 1000)
+                )
+    return _conversation_cache
+
+def flush_conversation_cache():
+    """Flush pending write-behind conversations (called at shutdown)"""
+    if _conversation_cache is not None:
+        _conversation_cache.close()
+
+def _load_conversations_from_disk(user_id):
+    with interprocess_lock(_get_user_lock_path(user_id), shared=True):
+        header = _read_header(user_id)
+        if header is not None:
+            conversations_data, message_counts = _assemble_conversations(user_id, header)
+    
+    if header is None:
+        migrated = migrate_user_conversations(user_id)
+        return migrated if migrated is not None else _empty_conversations(user_id)
+    
+    # A crash between appending to the log and rewriting the header leaves
+    # the header behind the log; trust the log so nothing is appended twice
+    if message_counts != header.get('message_counts'):
+        with user_conversations_lock(user_id):
+            header = _read_header(user_id)
+            conversations_data, message_counts = _assemble_conversations(user_id, header)
+            if message_counts != header.get('message_counts'):
+                # Header counters missed the same appends; recount lazily
+                for conv in conversations_data['conversations']:
+                    conv.pop('user_message_count', None)
+                _write_header(user_id, _build_header(conversations_data, message_counts))
+    
+    return conversations_data
 
 def load_user_conversations(user_id):
     """Load all conversations for a user"""
-    conversations_file = get_user_conversations_file(user_id)
-    
-    if not os.path.exists(conversations_file):
-        return {
-            'user_id': user_id,
-            'conversations': [],
-            'current_conversation_id': None
-        }
+    cache = get_conversation_cache()
+    if cache is None:
+        return _load_conversations_from_disk(user_id)
     
+    key = _get_user_lock_path(user_id)
+    conversations_data = cache.get(key, lambda: _read_signature(user_id))
+    if conversations_data is None:
+        # Fingerprint before reading so a concurrent write invalidates the entry
+        signature = _read_signature(user_id)
+        conversations_data = cache.put(key, user_id, _load_conversations_from_disk(user_id), signature)
+    return conversations_data
+
+def _write_conversations(user_id, conversations_data):
+    """
+    Write conversations to disk; caller holds user_conversations_lock.
+    Only messages not yet in the log are appended; the header is rewritten.
+    The log is rewritten only when conversations were dropped or truncated.
+    """
     try:
-        with open(conversations_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {
-            'user_id': user_id,
-            'conversations': [],
-            'current_conversation_id': None
-        }
+        header = _read_header(user_id) or {}
+        persisted_counts = header.get('message_counts', {})
+        current_ids = {conv['id'] for conv in conversations_data.get('conversations', [])}
+        
+        needs_rewrite = any(conv_id not in current_ids for conv_id in persisted_counts) or any(
+            persisted_counts.get(conv['id'], 0) > len(conv['messages'])
+            for conv in conversations_data.get('conversations', [])
+        )
+        if needs_rewrite:
+            _write_full(user_id, conversations_data)
+            return True
+        
+        new_records = []
+        message_counts = {}
+        for conv in conversations_data.get('conversations', []):
+            persisted = persisted_counts.get(conv['id'], 0)
+            new_records.append(encode_log_records(conv['id'], conv['messages'][persisted:]))
+            message_counts[conv['id']] = len(conv['messages'])
+        
+        data = b''.join(new_records)
+        if data:
+            _append_log(user_id, data)
+        _write_header(user_id, _build_header(conversations_data, message_counts))
+        return True
+    except Exception as e:
+        print(f"Error saving conversations for user {user_id}: {e}")
+        return False
 
 def save_user_conversations(user_id, conversations_data):
-    """Save conversations to file with thread safety"""
-    conversations_file = get_user_conversations_file(user_id)
+    """Save conversations with thread safety (deferred in write-behind mode)"""
+    cache = get_conversation_cache()
+    key = _get_user_lock_path(user_id)
     
-    with conversation_lock:
-        try:
-            with open(conversations_file, 'w', encoding='utf-8') as f:
-                json.dump(conversations_data, f, indent=2, ensure_ascii=False)
+    with user_conversations_lock(user_id):
+        if cache is not None and cache.write_behind:
+            cache.put(key, user_id, conversations_data, None, dirty=True)
             return True
-        except Exception as e:
-            print(f"Error saving conversations for user {user_id}: {e}")
-            return False
+        
+        saved = _write_conversations(user_id, conversations_data)
+        if cache is not None:
+            if saved:
+                cache.put(key, user_id, conversations_data, _read_signature(user_id))
+            else:
+                cache.discard(key)
+    return saved
 
 def create_new_conversation(user_id):
     """Create a new conversation for a user"""
@@ -56,37 +477,91 @@ def create_new_conversation(user_id):
         'user_id': user_id,
         'created_at': datetime.utcnow().isoformat(),
         'messages': [],
-        'summary': ''
+        'summary': '',
+        'user_message_count': 0,
+        'messages_since_summary': 0,
+        'summary_mark': 0
     }
 
+# In-memory id -> position map kept on the conversations document; it is
+# not written to disk (the header only stores the conversation entries)
+INDEX_KEY = '_conversation_index'
+
+def _get_conversation_index(conversations_data):
+    """Get the id -> position map, rebuilding it if the list was reshaped"""
+    index = conversations_data.get(INDEX_KEY)
+    if index is None or len(index) != len(conversations_data['conversations']):
+        index = {conv['id']: i for i, conv in enumerate(conversations_data['conversations'])}
+        conversations_data[INDEX_KEY] = index
+    return index
+
+def _ensure_counters(conv):
+    """Backfill running counters for conversations stored before they existed"""
+    if conv.get('user_message_count') is None:
+        conv['user_message_count'] = sum(1 for msg in conv['messages'] if msg['sender'] == 'user')
+        conv['messages_since_summary'] = 0 if conv.get('summary') else len(conv['messages'])
+    return conv
+
+def append_conversation(conversations_data, conv):
+    """Append a conversation and make it the current one"""
+    index = _get_conversation_index(conversations_data)
+    conversations_data['conversations'].append(conv)
+    index[conv['id']] = len(conversations_data['conversations']) - 1
+    conversations_data['current_conversation_id'] = conv['id']
+    return conv
+
+def get_summary_mark(conv):
+    """
+    Number of leading messages already folded into the summary. Summaries
+    written before the mark existed are treated as covering nothing, so
+    the next rolling update re-reads the conversation once.
+    """
+    return conv.get('summary_mark') or 0
+
+def set_conversation_summary(conv, summary, mark=None):
+    """Store a summary covering the first mark messages (default: all of them)"""
+    if mark is None:
+        mark = len(conv['messages'])
+    conv['summary'] = summary
+    conv['summary_mark'] = mark
+    conv['messages_since_summary'] = len(conv['messages']) - mark
+
 def add_message_to_conversation(conversations_data, message_data):
     """Add a message to the current conversation"""
-    current_conv_id = conversations_data['current_conversation_id']
+    current_conv = get_current_conversation(conversations_data)
     
-    if not current_conv_id:
+    if not current_conv:
         # Create new conversation
-        new_conv = create_new_conversation(conversations_data['user_id'])
-        conversations_data['conversations'].append(new_conv)
-        conversations_data['current_conversation_id'] = new_conv['id']
-        current_conv_id = new_conv['id']
-    
-    # Find current conversation
-    current_conv = None
-    for conv in conversations_data['conversations']:
-        if conv['id'] == current_conv_id:
-            current_conv = conv
-            break
-    
-    if current_conv:
-        # Generate proper message ID using message index within this conversation
-        message_index = len(current_conv['messages'])
-        timestamp = int(time.time())
-        message_data['id'] = f"{message_data['sender']}-{message_index}-{timestamp}"
-        
-        current_conv['messages'].append(message_data)
+        current_conv = append_conversation(
+            conversations_data, create_new_conversation(conversations_data['user_id'])
+        )
+    
+    # Generate proper message ID using message index within this conversation
+    message_index = len(current_conv['messages'])
+    timestamp = int(time.time())
+    message_data['id'] = f"{message_data['sender']}-{message_index}-{timestamp}"
+    
+    _ensure_counters(current_conv)
+    current_conv['messages'].append(message_data)
+    if message_data['sender'] == 'user':
+        current_conv['user_message_count'] += 1
+    current_conv['messages_since_summary'] += 1
     
     return conversations_data
 
+def get_conversation(conversations_data, conversation_id):
+    """Get a conversation by id"""
+    conversations = conversations_data['conversations']
+    position = _get_conversation_index(conversations_data).get(conversation_id)
+    if position is None or position >= len(conversations) or conversations[position]['id'] != conversation_id:
+        # List was reordered behind our back; rebuild once
+        conversations_data.pop(INDEX_KEY, None)
+        position = _get_conversation_index(conversations_data).get(conversation_id)
+        if position is None:
+            return None
+    
+    return conversations[position]
+
 def get_current_conversation(conversations_data):
     """Get the current active conversation"""
     current_conv_id = conversations_data['current_conversation_id']
@@ -94,10 +569,14 @@ def get_current_conversation(conversations_data):
     if not current_conv_id:
         return None
     
-    for conv in conversations_data['conversations']:
-        if conv['id'] == current_conv_id:
-            return conv
-    
+    return get_conversation(conversations_data, current_conv_id)
+
+def find_message(conversations_data, message_id):
+    """Find a message by id, searching the newest conversations first"""
+    for conv in reversed(conversations_data.get('conversations', [])):
+        for msg in reversed(conv['messages']):
+            if msg['id'] == message_id:
+                return msg
     return None
 
 def get_recent_messages(conversations_data, limit=10):
@@ -118,8 +597,8 @@ def should_summarize_conversation(conversations_data):
         return False
     
     # Summarize every 10 messages (only count user messages)
-    user_messages = [msg for msg in current_conv['messages'] if msg['sender'] == 'user']
-    return len(user_messages) > 0 and len(user_messages) % 5 == 0  # Every 5 user messages (10 total)
+    user_message_count = _ensure_counters(current_conv)['user_message_count']
+    return user_message_count > 0 and user_message_count % 5 == 0  # Every 5 user messages (10 total)
 
 def cleanup_old_conversations(conversations_data, keep_count=5):
     """Keep only the most recent conversations"""
@@ -129,29 +608,28 @@ def cleanup_old_conversations(conversations_data, keep_count=5):
         # Sort by created_at and keep most recent
         conversations.sort(key=lambda x: x['created_at'], reverse=True)
         conversations_data['conversations'] = conversations[:keep_count]
+        conversations_data.pop(INDEX_KEY, None)
         
         # Make sure current conversation is still valid
         current_id = conversations_data['current_conversation_id']
-        valid_ids = [conv['id'] for conv in conversations_data['conversations']]
         
-        if current_id not in valid_ids:
+        if current_id not in _get_conversation_index(conversations_data):
             conversations_data['current_conversation_id'] = conversations[0]['id'] if conversations else None
     
     return conversations_data
 
 def start_new_conversation(user_id):
     """Start a new conversation session"""
-    conversations_data = load_user_conversations(user_id)
-    
-    # Create new conversation
-    new_conv = create_new_conversation(user_id)
-    conversations_data['conversations'].append(new_conv)
-    conversations_data['current_conversation_id'] = new_conv['id']
-    
-    # Cleanup old conversations
-    conversations_data = cleanup_old_conversations(conversations_data)
-    
-    # Save to file
-    save_user_conversations(user_id, conversations_data)
+    with user_conversations_lock(user_id):
+        conversations_data = load_user_conversations(user_id)
+        
+        # Create new conversation
+        append_conversation(conversations_data, create_new_conversation(user_id))
+        
+        # Cleanup old conversations
+        conversations_data = cleanup_old_conversations(conversations_data)
+        
+        # Save to file
+        save_user_conversations(user_id, conversations_data)
     
-    return conversations_data
\ No newline at end of file
+    return conversations_data
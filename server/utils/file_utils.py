@@ -1,62 +1,344 @@
-import json
+import copy
 import os
-from threading import Lock
+import time
+import threading
+from contextlib import contextmanager
+from threading import Lock, RLock
 from flask import current_app
+from .lock_utils import interprocess_lock, atomic_write
+from .codecs import (
+    DecodeError, validate_user, decode_users, encode_users, decode_journal_record, encode_journal_record
+)
 
-# File lock to handle concurrent access
-file_lock = Lock()
+# How often (seconds) the repository re-checks users.json for external edits
+MTIME_CHECK_INTERVAL = 1.0
 
-def load_users():
-    """Load users from JSON file"""
-    users_file = current_app.config['USERS_FILE']
-    
-    if not os.path.exists(users_file):
-        return {}
-    
-    try:
-        with open(users_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
 
-def save_users(users_data):
-    """Save users to JSON file with thread safety"""
-    users_file = current_app.config['USERS_FILE']
-    
-    with file_lock:
+class UserRepository:
+    """
+    In-memory view of users.json with primary-key and email indexes.
+
+    The file is parsed once and kept in memory. Reads are served from the
+    indexes; the file's mtime is only re-checked every MTIME_CHECK_INTERVAL
+    seconds so edits made outside this process are still picked up.
+    Writes made through the repository update the indexes directly.
+
+    In journal mode users.json is a snapshot and every mutation is appended
+    as one JSON line to users.json.journal. Once the journal holds
+    compact_threshold records a background thread folds it into a new
+    snapshot. Loading replays snapshot + journal in either mode; with
+    journaling off, the first write folds a leftover journal into the
+    snapshot, so switching the mode never loses or resurrects records.
+
+    Several processes may share the files: reads take a shared fcntl lock,
+    writes take an exclusive one and first catch up with whatever other
+    processes appended, and snapshots are swapped in with an atomic rename.
+    """
+
+    def __init__(self, users_file, journal=False, compact_threshold=1000):
+        self.users_file = users_file
+        self.journal = journal
+        self.compact_threshold = compact_threshold
+        self.journal_file = f'{users_file}.journal'
+        self._lock = RLock()
+        self._users = None
+        self._email_index = {}
+        self._snapshot_signature = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._compacting = False
+        self._last_check = 0.0
+
+    def _file_signature(self):
+        """Identify the snapshot file; a rename-replace changes the inode"""
+        try:
+            stat = os.stat(self.users_file)
+            return stat.st_ino, stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _journal_size(self):
+        try:
+            return os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            return 0
+
+    def _read_file(self):
+        if not os.path.exists(self.users_file):
+            return {}
         try:
-            with open(users_file, 'w', encoding='utf-8') as f:
-                json.dump(users_data, f, indent=2, ensure_ascii=False)
-            return True
+            with open(self.users_file, 'rb') as f:
+                return decode_users(f.read())
+        except (*DecodeError, FileNotFoundError):
+            return {}
+
+    def _rebuild_indexes(self):
+        self._email_index = {
+            user_data.get('email'): user_id
+            for user_id, user_data in self._users.items()
+            if user_data.get('email')
+        }
+
+    def _apply(self, users, record):
+        """Apply one decoded journal record to a users dict"""
+        op = record.op
+        user_id = record.id
+        if op == 'put':
+            users[user_id] = record.data
+        elif op == 'update' and user_id in users:
+            users[user_id] = {**users[user_id], **record.data}
+        elif op == 'delete':
+            users.pop(user_id, None)
+        elif op == 'reset':
+            users.clear()
+            users.update(record.data)
+
+    def _replay(self, users, offset=0):
+        """
+        Replay journal records from offset; returns (new_offset, count).
+        A torn last line (writer still appending) is left for the next read.
+        """
+        count = 0
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    try:
+                        self._apply(users, decode_journal_record(line))
+                        count += 1
+                    except DecodeError:
+                        print(f"Skipping bad journal record in {self.journal_file}")
+        except FileNotFoundError:
+            pass
+        return offset, count
+
+    def _load(self):
+        self._snapshot_signature = self._file_signature()
+        users = self._read_file()
+        # Replayed whatever the mode: a journal may be left from journal mode
+        self._journal_offset, self._journal_records = self._replay(users)
+        self._users = users
+        self._rebuild_indexes()
+
+    def _refresh(self):
+        """Bring memory up to date with disk; caller holds self._lock and a file lock"""
+        self._last_check = time.monotonic()
+        if self._users is None or self._file_signature() != self._snapshot_signature:
+            self._load()
+        else:
+            size = self._journal_size()
+            if size < self._journal_offset:
+                self._load()
+            elif size > self._journal_offset:
+                self._journal_offset, count = self._replay(self._users, self._journal_offset)
+                self._journal_records += count
+                self._rebuild_indexes()
+
+    def _ensure_fresh(self):
+        """Load on first use and reload when the file changed on disk"""
+        if self._users is not None and time.monotonic() - self._last_check < MTIME_CHECK_INTERVAL:
+            return
+
+        with self._lock, interprocess_lock(self.users_file, shared=True):
+            if self._users is None or time.monotonic() - self._last_check >= MTIME_CHECK_INTERVAL:
+                self._refresh()
+
+    def _write_snapshot(self):
+        """Write the full user set to users.json via temp file + rename"""
+        try:
+            atomic_write(self.users_file, encode_users(self._users))
         except Exception as e:
             print(f"Error saving users: {e}")
             return False
+        self._snapshot_signature = self._file_signature()
+        return True
+
+    def _append(self, record):
+        """Append one mutation to the journal (journal mode)"""
+        line = encode_journal_record(record)
+        try:
+            with open(self.journal_file, 'ab') as f:
+                f.write(line)
+        except Exception as e:
+            print(f"Error appending to users journal: {e}")
+            return False
+        self._journal_offset += len(line)
+        self._journal_records += 1
+        if self._journal_records >= self.compact_threshold:
+            self._start_compaction()
+        return True
+
+    def _persist(self, record):
+        """Persist one mutation; caller holds the exclusive locks"""
+        if self.journal:
+            return self._append(record)
+        # A snapshot written over an unfolded journal would be undone by
+        # replaying the journal on the next load
+        if self._journal_offset:
+            print("Not saving users: the journal could not be folded into users.json")
+            return False
+        return self._write_snapshot()
+
+    def _fold_journal(self):
+        """
+        Write the replayed state as the snapshot, then empty the journal;
+        caller holds the exclusive locks. The snapshot is renamed into place
+        before the journal is truncated; if the process dies in between,
+        replaying the journal over the new snapshot yields the same state.
+        """
+        if not self._write_snapshot():
+            return False
+        open(self.journal_file, 'w').close()
+        self._journal_offset = 0
+        self._journal_records = 0
+        return True
+
+    @contextmanager
+    def _mutation(self):
+        """Take the exclusive locks for a write and catch up with disk first"""
+        with self._lock, interprocess_lock(self.users_file):
+            self._refresh()
+            if not self.journal and self._journal_offset:
+                # Left from journal mode: fold it before the snapshot moves on
+                self._fold_journal()
+            yield
+
+    def _start_compaction(self):
+        if self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(target=self.compact, name='users-journal-compactor', daemon=True).start()
+
+    def compact(self):
+        """
+        Fold the journal into a new snapshot.
+
+        Runs under the exclusive lock so no process appends meanwhile.
+        """
+        try:
+            with self._mutation():
+                self._fold_journal()
+        except Exception as e:
+            print(f"Error compacting users journal: {e}")
+        finally:
+            self._compacting = False
+
+    def all(self):
+        """Return a copy of every user keyed by id"""
+        self._ensure_fresh()
+        return copy.deepcopy(self._users)
+
+    def replace_all(self, users_data):
+        """Replace the full user set (used by the legacy save_users API)"""
+        with self._mutation():
+            users_data = copy.deepcopy(users_data)
+            self._users = users_data
+            self._rebuild_indexes()
+            return self._persist({'op': 'reset', 'data': users_data})
+
+    def find_by_id(self, user_id):
+        self._ensure_fresh()
+        user_data = self._users.get(user_id)
+        return copy.deepcopy(user_data) if user_data is not None else None
+
+    def find_by_email(self, email):
+        self._ensure_fresh()
+        user_id = self._email_index.get(email)
+        # Unlocked: a concurrent reload or delete may have dropped the user
+        user_data = self._users.get(user_id) if user_id is not None else None
+        if user_data is None:
+            return None, None
+        return user_id, copy.deepcopy(user_data)
+
+    def add(self, user_id, user_data):
+        """Insert a new user; returns False if the id or email is taken or the record is invalid"""
+        try:
+            validate_user(user_data)
+        except DecodeError as e:
+            print(f"Rejecting invalid user record {user_id}: {e}")
+            return False
+        with self._mutation():
+            email = user_data.get('email')
+            if user_id in self._users or (email and email in self._email_index):
+                return False
+            user_data = copy.deepcopy(user_data)
+            self._users[user_id] = user_data
+            if email:
+                self._email_index[email] = user_id
+            return self._persist({'op': 'put', 'id': user_id, 'data': user_data})
+
+    def update(self, user_id, updated_data):
+        with self._mutation():
+            user_data = self._users.get(user_id)
+            if user_data is None:
+                return False
+            updated_data = copy.deepcopy(updated_data)
+            new_user_data = {**user_data, **updated_data}
+            self._users[user_id] = new_user_data
+            old_email = user_data.get('email')
+            new_email = new_user_data.get('email')
+            if new_email != old_email:
+                self._email_index.pop(old_email, None)
+                if new_email:
+                    self._email_index[new_email] = user_id
+            return self._persist({'op': 'update', 'id': user_id, 'data': updated_data})
+
+    def delete(self, user_id):
+        with self._mutation():
+            user_data = self._users.pop(user_id, None)
+            if user_data is None:
+                return False
+            self._email_index.pop(user_data.get('email'), None)
+            return self._persist({'op': 'delete', 'id': user_id})
+
+
+# One repository per users file, shared by all requests in this process
+_repositories = {}
+_repositories_lock = Lock()
+
+def get_user_repository():
+    """Get the repository for the configured users file"""
+    users_file = current_app.config['USERS_FILE']
+    repository = _repositories.get(users_file)
+    if repository is None:
+        with _repositories_lock:
+            repository = _repositories.get(users_file)
+            if repository is None:
+                repository = UserRepository(
+                    users_file,
+                    journal=current_app.config.get('USERS_JOURNAL_ENABLED', False),
+                    compact_threshold=current_app.config.get('USERS_JOURNAL_COMPACT_THRESHOLD', 1000)
+                )
+                _repositories[users_file] = repository
+    return repository
+
+def load_users():
+    """Load users from JSON file"""
+    return get_user_repository().all()
+
+def save_users(users_data):
+    """Save users to JSON file with thread safety"""
+    return get_user_repository().replace_all(users_data)
 
 def find_user_by_email(email):
     """Find a user by email address"""
-    users_data = load_users()
-    for user_id, user_data in users_data.items():
-        if user_data.get('email') == email:
-            return user_id, user_data
-    return None, None
+    return get_user_repository().find_by_email(email)
 
 def find_user_by_id(user_id):
     """Find a user by ID"""
-    users_data = load_users()
-    return users_data.get(user_id)
+    return get_user_repository().find_by_id(user_id)
+
+def add_user(user_id, user_data):
+    """Add a new user"""
+    return get_user_repository().add(user_id, user_data)
 
 def update_user(user_id, updated_data):
     """Update a user's data"""
-    users_data = load_users()
-    if user_id in users_data:
-        users_data[user_id].update(updated_data)
-        return save_users(users_data)
-    return False
+    return get_user_repository().update(user_id, updated_data)
 
 def delete_user(user_id):
     """Delete a user"""
-    users_data = load_users()
-    if user_id in users_data:
-        del users_data[user_id]
-        return save_users(users_data)
-    return False
\ No newline at end of file
+    return get_user_repository().delete(user_id)
@@ -0,0 +1,90 @@
+import re
+
+from ..intent_config import TEACHING_KEYWORDS, SCRIPTS, UNSPACED_SCRIPTS, get_language_script
+
+# Typographic apostrophes are folded so "don’t" matches "don't"
+_APOSTROPHES = str.maketrans({'’': "'", 'ʼ': "'", '‘': "'"})
+
+def _trie_pattern(keywords):
+    """
+    Regex alternation of keywords factored by common prefix, so matching
+    walks a trie instead of trying every keyword at every position.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}  # End of a keyword
+
+    def build(node):
+        ends = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not ends:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if ends else group
+
+    return build(trie)
+
+def _compile_keywords():
+    """
+    One case-insensitive pattern for every language's teaching keywords,
+    plus a map from each keyword back to the languages that list it.
+    Keywords in spaced scripts must start a word.
+    """
+    keyword_languages = {}
+    for language, keywords in TEACHING_KEYWORDS.items():
+        for keyword in keywords:
+            keyword_languages.setdefault(keyword.lower(), set()).add(language)
+
+    spaced, unspaced = [], []
+    for keyword, languages in keyword_languages.items():
+        if any(get_language_script(language) in UNSPACED_SCRIPTS for language in languages):
+            unspaced.append(keyword)
+        else:
+            spaced.append(keyword)
+
+    pattern = rf'(?<!\w){_trie_pattern(spaced)}|{_trie_pattern(unspaced)}'
+    return re.compile(pattern, re.IGNORECASE), keyword_languages
+
+# Built once at import
+_keyword_pattern, _keyword_languages = _compile_keywords()
+_script_patterns = {name: re.compile(f'[{chars}]') for name, chars in SCRIPTS.items()}
+
+def _has_teaching_keyword(message, language):
+    for match in _keyword_pattern.finditer(message.lower()):
+        if language in _keyword_languages.get(match.group(0), ()):
+            return True
+    return False
+
+def _is_native_script(message, native_language, learning_language):
+    """
+    True if the message is written mostly in the native language's script
+    and that script differs from the learning language's.
+    """
+    native_script = get_language_script(native_language)
+    learning_script = get_language_script(learning_language)
+    if native_script == learning_script:
+        return False
+    native_letters = len(_script_patterns[native_script].findall(message))
+    learning_letters = len(_script_patterns[learning_script].findall(message))
+    return native_letters > learning_letters
+
+def detect_intent(message, native_language, learning_language, script_check=True):
+    """
+    'teaching' if the message asks for help in the user's native language,
+    either through a native-language teaching keyword or (with
+    script_check) by being written in the native script; else 'chat'.
+    """
+    message = message.translate(_APOSTROPHES)
+
+    if _has_teaching_keyword(message, native_language):
+        return 'teaching'
+
+    if script_check and _is_native_script(message, native_language, learning_language):
+        return 'teaching'
+
+    return 'chat'
@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+
+
+class JobQueue:
+    """
+    In-process background job queue with a small worker pool.
+
+    Jobs are submitted under a key; a key that is already queued is not
+    queued again, and a key resubmitted while its job is running is run
+    once more after it finishes, so the latest state is always picked up.
+    Failed jobs are retried with exponential backoff.
+
+    submit/depth/stats/close is the whole interface, so an external broker
+    can stand in for this class later without touching callers.
+    """
+
+    def __init__(self, name, workers=2, max_retries=3, backoff_ms=1000):
+        self.name = name
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_ms = backoff_ms
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._states = {}  # key -> 'queued' | 'running' | 'rerun'
+        self._threads = []
+        self._closed = False
+        self._completed = 0
+        self._retried = 0
+        self._failed = 0
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) unless a job for key is already pending"""
+        with self._lock:
+            if self._closed:
+                return False
+            state = self._states.get(key)
+            if state == 'running':
+                self._states[key] = 'rerun'
+                return True
+            if state is not None:
+                return False
+            self._states[key] = 'queued'
+            self._ensure_workers()
+        self._queue.put((key, func, args, kwargs, 0))
+        return True
+
+    def _retry_later(self, job, attempt):
+        delay = self.backoff_ms * (2 ** attempt) / 1000
+        timer = threading.Timer(delay, self._queue.put, (job,))
+        timer.daemon = True
+        timer.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            key, func, args, kwargs, attempt = job
+            with self._lock:
+                if self._states.get(key) == 'queued':
+                    self._states[key] = 'running'
+
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                if attempt < self.max_retries:
+                    print(f"{self.name} job {key} failed (attempt {attempt + 1}), retrying: {e}")
+                    with self._lock:
+                        self._retried += 1
+                        if self._states.get(key) == 'running':
+                            self._states[key] = 'queued'
+                    self._retry_later((key, func, args, kwargs, attempt + 1), attempt)
+                    continue
+                print(f"{self.name} job {key} failed after {attempt + 1} attempts: {e}")
+                with self._lock:
+                    self._failed += 1
+            else:
+                with self._lock:
+                    self._completed += 1
+
+            with self._lock:
+                if self._states.pop(key, None) == 'rerun' and not self._closed:
+                    self._states[key] = 'queued'
+                    self._queue.put((key, func, args, kwargs, 0))
+
+    def depth(self):
+        """Number of jobs waiting or running"""
+        with self._lock:
+            return len(self._states)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'depth': len(self._states),
+                'running': sum(1 for state in self._states.values() if state != 'queued'),
+                'completed': self._completed,
+                'retried': self._retried,
+                'failed': self._failed
+            }
+
+    def close(self, timeout=5.0):
+        """Stop accepting jobs and give queued ones up to timeout seconds to finish"""
+        with self._lock:
+            self._closed = True
+        deadline = time.monotonic() + timeout
+        while self.depth() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        for _ in self._threads:
+            self._queue.put(None)
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from threading import RLock
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+# Number of lock stripes shared by all users
+DEFAULT_STRIPES = 256
+
+
+class StripedLock:
+    """
+    Fixed pool of re-entrant locks selected by hashing a key.
+
+    Different users almost always map to different stripes, so they do not
+    block each other, while all operations for one user serialize on the
+    same lock. Memory stays constant no matter how many users there are.
+    """
+
+    def __init__(self, stripes=DEFAULT_STRIPES):
+        self._locks = [RLock() for _ in range(stripes)]
+
+    def get(self, key):
+        """Get the lock guarding key"""
+        return self._locks[zlib.crc32(str(key).encode('utf-8')) % len(self._locks)]
+
+
+# Per-user locks for read-modify-write of user-owned files
+user_locks = StripedLock()
+
+def user_lock(user_id):
+    """Get the lock serializing all writes for a user"""
+    return user_locks.get(user_id)
+
+
+# Paths this thread already holds an interprocess lock on
+_held_locks = threading.local()
+
+@contextmanager
+def interprocess_lock(path, shared=False):
+    """
+    Advisory fcntl lock on <path>.lock, shared for readers and exclusive
+    for writers, so several worker processes can use the same files.
+
+    Re-entrant per thread: if this thread already holds a lock on path the
+    nested call is a no-op, so take the exclusive lock first when a write
+    path also reads. Without fcntl this only yields.
+    """
+    held = getattr(_held_locks, 'paths', None)
+    if held is None:
+        held = _held_locks.paths = set()
+
+    if fcntl is None or path in held:
+        yield
+        return
+
+    with open(f'{path}.lock', 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def atomic_write(path, data):
+    """
+    Write text or bytes to path via a unique temp file in the same
+    directory and rename it into place, so readers never see a partially
+    written file.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,55 @@
+"""
+Joining MP3 renders by concatenating their frames.
+
+MPEG audio is a plain sequence of self-contained frames, so renders with
+the same voice, sample rate and bitrate can be joined byte-wise once the
+per-file metadata is removed: ID3 tags, and the Xing/Info frame some
+encoders put first, which states the duration of that file alone.
+"""
+
+# Layer III bitrates in kbps by header index, for MPEG-1 and MPEG-2/2.5
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000)    # MPEG-2.5
+}
+
+def _frame_length(header):
+    """Length in bytes of the Layer III frame starting with header, or None"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    padding = (header[2] >> 1) & 0x01
+    bitrate = _BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    samples_factor = 144 if version == 3 else 72
+    return samples_factor * bitrate // sample_rate + padding
+
+def strip_metadata(data):
+    """The audio frames of an MP3 render, without ID3 tags or a Xing/Info frame"""
+    data = bytes(data)
+    if data[:3] == b'ID3' and len(data) >= 10:
+        # Tag size is a 28-bit syncsafe integer, after a 10-byte header
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b'TAG':
+        data = data[:-128]
+
+    length = _frame_length(data[:4])
+    if length and (b'Xing' in data[:length] or b'Info' in data[:length]):
+        data = data[length:]
+    return data
+
+def concat_mp3(renders):
+    """One MP3 stream playing renders back to back"""
+    return b''.join(strip_metadata(render) for render in renders)
@@ -0,0 +1,127 @@
+"""
+Token counting and budgeted prompt assembly.
+
+Counts use tiktoken when it is installed (the encoding is loaded once per
+model and counts are memoized); otherwise a bytes/4 estimate, which is
+close for Latin scripts and errs high for CJK.
+"""
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to the byte estimate
+    tiktoken = None
+
+# Prompt token budgets per chat model. Well under the context windows on
+# purpose: prompt size drives latency and cost more than context limits do.
+MODEL_PROMPT_BUDGETS = {
+    'gpt-4': 2000,
+    'gpt-4-turbo': 3000,
+    'gpt-4o': 3000,
+    'gpt-4o-mini': 3000,
+    'gpt-3.5-turbo': 1500
+}
+DEFAULT_PROMPT_BUDGET = 2000
+
+# Chat format overhead per message (role, separators) and per request
+MESSAGE_OVERHEAD_TOKENS = 4
+REQUEST_OVERHEAD_TOKENS = 3
+
+def get_prompt_budget(model, override=0):
+    """Prompt token budget for model; a positive override wins"""
+    if override:
+        return override
+    return MODEL_PROMPT_BUDGETS.get(model, DEFAULT_PROMPT_BUDGET)
+
+@lru_cache(maxsize=None)
+def _get_encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:  # e.g. BPE files not downloadable
+        print(f"tiktoken unavailable for {model}, estimating tokens: {e}")
+        return None
+
+def _encoded_length(text, model):
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text.encode('utf-8')) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=8192)
+def count_tokens(text, model='gpt-4'):
+    """Number of tokens text encodes to for model (memoized; for short pieces)"""
+    return _encoded_length(text, model)
+
+def truncate_to_tokens(text, max_tokens, model='gpt-4'):
+    """Cut text to at most max_tokens, marking the cut with an ellipsis"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    max_tokens = max(max_tokens - 1, 0)  # Room for the ellipsis
+    encoding = _get_encoding(model)
+    if encoding is None:
+        clipped = text.encode('utf-8')[:max_tokens * 4].decode('utf-8', 'ignore')
+    else:
+        clipped = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    return clipped.rstrip() + '…'
+
+def prompt_section(text, priority=None, group=None, header=False, role=None):
+    """
+    One piece of a prompt. A section with a role starts a new chat message;
+    sections without one are appended to the message before them.
+    priority None means required; otherwise higher priorities are kept
+    longer. A header section is dropped together with the last remaining
+    item of its group.
+    """
+    return {'text': text, 'priority': priority, 'group': group, 'header': header, 'role': role}
+
+def _section_cost(section, model):
+    cost = count_tokens(section['text'], model)
+    if section['role']:
+        cost += MESSAGE_OVERHEAD_TOKENS
+    return cost
+
+def assemble_messages(sections, budget, model='gpt-4'):
+    """
+    Turn sections (in order) into chat messages that fit budget tokens.
+
+    Droppable sections go lowest priority first, earliest first within a
+    priority. Returns (messages, tokens) where tokens is the count of the
+    whole request including chat formatting overhead.
+    """
+    kept = list(sections)
+    costs = [_section_cost(section, model) for section in kept]
+    total = sum(costs) + REQUEST_OVERHEAD_TOKENS
+
+    while total > budget:
+        candidates = [
+            (section['priority'], i) for i, section in enumerate(kept)
+            if section['priority'] is not None and not section['header']
+        ]
+        if not candidates:
+            break
+        _, position = min(candidates)
+        group = kept[position]['group']
+        total -= costs.pop(position)
+        kept.pop(position)
+
+        if group is not None and not any(s['group'] == group and not s['header'] for s in kept):
+            for i in reversed(range(len(kept))):
+                if kept[i]['group'] == group:
+                    total -= costs.pop(i)
+                    kept.pop(i)
+
+    messages = []
+    for section in kept:
+        if section['role'] or not messages:
+            messages.append({'role': section['role'] or 'system', 'content': section['text']})
+        else:
+            messages[-1]['content'] += section['text']
+
+    tokens = REQUEST_OVERHEAD_TOKENS + sum(
+        _encoded_length(message['content'], model) + MESSAGE_OVERHEAD_TOKENS for message in messages
+    )
+    return messages, tokens
@@ -0,0 +1,75 @@
+"""
+SSML for Azure TTS with precomputed pause tags.
+
+Pause tags depend only on the speed, so each speed bucket's
+mark -> "mark<break/>" replacements are built once, as is the <speak>
+markup around the text per voice and bucket, behind one cache lookup.
+Text without XML metacharacters (nearly every reply) then gets one
+C-level str.replace per punctuation mark it contains, which beats a
+regex or translate() pass on reply-sized text. Text that needs escaping
+is escaped and paused in a single regex pass instead, since escaping
+adds semicolons that a later replace would pause after.
+"""
+import re
+from functools import lru_cache
+
+from ..language_config import PAUSE_PATTERN
+
+# Punctuation followed by a pause, by PAUSE_PATTERN entry
+PAUSE_MARKS = {
+    'sentence': '.!?。！？',
+    'comma': ',，、',
+    'semicolon': ';；'
+}
+
+_XML_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+_MARKUP = re.compile('[' + re.escape(''.join(_XML_ESCAPES) + ''.join(PAUSE_MARKS.values())) + ']')
+
+def speed_bucket(speed_rate):
+    """The speed as rendered: prosody rate and pauses use one decimal"""
+    return max(round(speed_rate, 1), 0.1)
+
+def voice_locale(voice_name):
+    """'de-DE' for 'de-DE-ConradNeural'"""
+    return '-'.join(voice_name.split('-')[:2])
+
+def pause_replacements(bucket):
+    """{mark: mark followed by its <break>}, pauses scaled by 1/speed"""
+    pause_multiplier = 1.0 / bucket
+    replacements = {}
+    for pause, marks in PAUSE_MARKS.items():
+        duration = int(PAUSE_PATTERN[pause] * pause_multiplier)
+        for mark in marks:
+            replacements[mark] = f'{mark}<break time="{duration}ms"/>'
+    return replacements
+
+class _Template:
+    """Everything build_ssml needs for one voice and speed bucket"""
+
+    def __init__(self, voice_name, bucket):
+        self.head = (
+            f'<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="{voice_locale(voice_name)}">'
+            f'<voice name="{voice_name}"><prosody rate="{bucket:.1f}">'
+        )
+        self.tail = '</prosody></voice></speak>'
+        replacements = pause_replacements(bucket)
+        self.pauses = tuple(replacements.items())
+        self.ascii_pauses = tuple(item for item in self.pauses if item[0].isascii())
+        markup = {**_XML_ESCAPES, **replacements}
+        self.escape_and_pause = lambda text: _MARKUP.sub(lambda match: markup[match.group()], text)
+
+@lru_cache(maxsize=1024)
+def _template(voice_name, bucket):
+    return _Template(voice_name, bucket)
+
+def build_ssml(text, voice_name, speed_rate=1.0):
+    """SSML speaking text with voice_name at speed_rate, with natural pauses"""
+    template = _template(voice_name, speed_bucket(speed_rate))
+    if '&' in text or '<' in text or '>' in text:
+        return template.head + template.escape_and_pause(text) + template.tail
+
+    # isascii() is a flag check: ASCII text cannot hold the CJK marks
+    for mark, replacement in template.ascii_pauses if text.isascii() else template.pauses:
+        if mark in text:
+            text = text.replace(mark, replacement)
+    return template.head + text + template.tail
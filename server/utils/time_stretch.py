@@ -0,0 +1,117 @@
+"""
+Pitch-preserving time stretch (WSOLA) for speech renders.
+
+A reply rendered once at speed 1.0 as PCM can be played at any other
+speed without another TTS call. build_ssml scales prosody rate by speed
+and every pause by 1/speed, so the whole render scales uniformly
+and stretching the 1.0 render by 1/speed gives the same timing, pauses
+included. The stretched audio is encoded to MP3 at the bitrate of the
+Azure MP3 renders, so it costs no more to serve than a fresh render.
+
+Needs numpy and lameenc; is_available() is False without either.
+"""
+import io
+import wave
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # Optional: speed changes fall back to a new TTS render
+    np = None
+
+try:
+    import lameenc
+except ImportError:  # Likewise; stretched audio is only ever served as MP3
+    lameenc = None
+
+# Analysis frame and how far a frame may shift to line up with the
+# previous one, in seconds
+FRAME_SECONDS = 0.04
+TOLERANCE_SECONDS = 0.01
+
+# Same as the Azure renders (Audio16Khz32KBitRateMonoMp3)
+MP3_BITRATE_KBPS = 32
+
+def is_available():
+    return np is not None and lameenc is not None
+
+def read_wav(data):
+    """(int16 mono samples, sample rate) of 16-bit mono WAV bytes"""
+    with wave.open(io.BytesIO(data), 'rb') as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise ValueError("Expected 16-bit mono WAV")
+        frames = wav.readframes(wav.getnframes())
+        return np.frombuffer(frames, dtype='<i2'), wav.getframerate()
+
+def write_wav(samples, sample_rate):
+    """16-bit mono WAV bytes of int16 samples"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype('<i2').tobytes())
+    return buffer.getvalue()
+
+def wsola(samples, sample_rate, speed):
+    """
+    samples played speed times faster (speed < 1 is slower) at the same
+    pitch. Frames are taken every speed * hop input samples and
+    overlap-added every hop output samples; each frame is shifted by up
+    to the tolerance to best continue the previous one (cross-correlation
+    over all shifts in one matrix product).
+    """
+    if speed == 1.0 or len(samples) == 0:
+        return samples
+
+    frame = int(sample_rate * FRAME_SECONDS) // 2 * 2
+    hop = frame // 2
+    tolerance = int(sample_rate * TOLERANCE_SECONDS)
+    analysis_hop = hop * speed
+
+    x = samples.astype(np.float32)
+    output_length = int(round(len(x) / speed))
+    frame_count = output_length // hop + 2
+
+    # Enough padding that every frame and search window stays in bounds
+    padding = tolerance + 2 * frame + int(analysis_hop) + 1
+    x = np.pad(x, (padding, padding))
+    # Periodic Hann windows at half overlap sum to exactly one
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)
+    y = np.zeros(frame_count * hop + frame, dtype=np.float32)
+
+    # Frame m starts half a frame early so output sample 0 is a window peak
+    positions = padding - hop + np.round(np.arange(frame_count + 1) * analysis_hop).astype(int)
+    shift = 0
+    for m in range(frame_count):
+        start = positions[m] + shift
+        y[m * hop:m * hop + frame] += x[start:start + frame] * window
+
+        # The input that naturally follows this frame, and where the next
+        # frame should start to continue it most smoothly
+        natural = x[start + hop:start + hop + frame]
+        search = x[positions[m + 1] - tolerance:positions[m + 1] + tolerance + frame]
+        candidates = sliding_window_view(search, frame)
+        shift = int(np.argmax(candidates @ natural)) - tolerance
+
+    y = y[hop:hop + output_length]
+    return np.clip(np.round(y), -32768, 32767).astype(np.int16)
+
+def encode_mp3(samples, sample_rate):
+    """Mono MP3 bytes of int16 samples"""
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(MP3_BITRATE_KBPS)
+    encoder.set_in_sample_rate(sample_rate)
+    encoder.set_channels(1)
+    encoder.set_quality(2)
+    return bytes(encoder.encode(samples.astype('<i2').tobytes()) + encoder.flush())
+
+def stretch_wav(data, speed):
+    """WAV bytes of a 16-bit mono WAV render played at speed"""
+    samples, sample_rate = read_wav(data)
+    return write_wav(wsola(samples, sample_rate, speed), sample_rate)
+
+def stretch_wav_to_mp3(data, speed):
+    """MP3 bytes of a 16-bit mono WAV render played at speed"""
+    samples, sample_rate = read_wav(data)
+    return encode_mp3(wsola(samples, sample_rate, speed), sample_rate)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask app with DATA_DIR in a temp dir and the conversation cache off"""
+    from flask import Flask
+    app = Flask('tests')
+    app.config.update(
+        DATA_DIR=str(tmp_path),
+        USERS_FILE=str(tmp_path / 'users.json'),
+        CONVERSATION_CACHE_MAX_BYTES=0
+    )
+    with app.app_context():
+        yield app
@@ -0,0 +1,66 @@
+import pytest
+
+from server.utils.audio_formats import (
+    AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT, accepts_webm, get_audio_format, negotiate_audio_format
+)
+
+WEBM = 'application/json, audio/webm;q=0.9'
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('audio/webm', True),
+    ('application/json, audio/webm;q=0.9', True),
+    ('AUDIO/WEBM; Q=0.5', True),
+    ('audio/webm;codecs=opus', True),
+    ('audio/webm;q=0', False),
+    ('audio/webm;q=0.0', False),
+    ('audio/webm;q=abc', False),
+    ('audio/*', False),
+    ('*/*', False),
+    ('audio/mpeg, audio/webmx', False),
+    ('', False),
+    (None, False)
+])
+def test_accepts_webm(accept, expected):
+    assert accepts_webm(accept) is expected
+
+@pytest.mark.parametrize('hints, expected', [
+    ({'Save-Data': 'on'}, 'webm-opus-low'),
+    ({'Save-Data': ' ON '}, 'webm-opus-low'),
+    ({'ECT': 'slow-2g'}, 'webm-opus-low'),
+    ({'ECT': '2g'}, 'webm-opus-low'),
+    ({'ECT': '3g'}, 'webm-opus'),
+    ({'ECT': '4g'}, 'mp3'),
+    ({'Downlink': '0.4'}, 'webm-opus-low'),
+    ({'Downlink': '0.5'}, 'webm-opus'),
+    ({'Downlink': '1.9'}, 'webm-opus'),
+    ({'Downlink': '2.0'}, 'mp3'),
+    ({'Downlink': 'fast'}, 'mp3'),
+    ({'ECT': '3g', 'Downlink': '0.1'}, 'webm-opus'),
+    ({'Save-Data': 'off', 'ECT': '4g', 'Downlink': '10'}, 'mp3'),
+    ({}, 'mp3')
+])
+def test_negotiate_by_client_hints(hints, expected):
+    assert negotiate_audio_format(None, {'Accept': WEBM, **hints}) == expected
+
+def test_negotiate_needs_webm_in_accept():
+    for accept in ('application/json', 'audio/*', 'audio/webm;q=0'):
+        assert negotiate_audio_format(None, {'Accept': accept, 'Save-Data': 'on'}) == 'mp3'
+
+def test_negotiate_explicit_format_wins():
+    assert negotiate_audio_format('webm-opus', {}) == 'webm-opus'
+    assert negotiate_audio_format('mp3', {'Accept': WEBM, 'ECT': '2g'}) == 'mp3'
+
+def test_negotiate_ignores_unknown_or_disabled_formats():
+    assert negotiate_audio_format('flac', {}) == DEFAULT_AUDIO_FORMAT
+    assert negotiate_audio_format('webm-opus', {}, enabled=('mp3',)) == 'mp3'
+
+def test_negotiate_respects_enabled_formats():
+    headers = {'Accept': WEBM, 'ECT': '2g'}
+    assert negotiate_audio_format(None, headers, enabled=('mp3', 'webm-opus')) == 'webm-opus'
+    assert negotiate_audio_format(None, headers, enabled=('mp3',)) == 'mp3'
+
+def test_get_audio_format():
+    assert get_audio_format('webm-opus-low') == AUDIO_FORMATS['webm-opus-low']
+    assert get_audio_format('flac') == AUDIO_FORMATS[DEFAULT_AUDIO_FORMAT]
+    assert get_audio_format(None)['stitchable']
@@ -0,0 +1,85 @@
+import os
+import threading
+
+from server.utils.audio_store import AudioStore, audio_store_key
+
+
+def key(n):
+    return audio_store_key(f'<speak>{n}</speak>', 'de-DE-KatjaNeural')
+
+
+def test_get_or_render_renders_once(tmp_path):
+    store = AudioStore(str(tmp_path))
+    calls = []
+
+    def render():
+        calls.append(1)
+        return b'audio'
+
+    assert store.get_or_render(key(1), render) == b'audio'
+    assert store.get_or_render(key(1), render) == b'audio'
+    assert calls == [1]
+    assert store.stats()['entries'] == 1
+
+def test_get_or_render_renders_once_across_threads(tmp_path):
+    store = AudioStore(str(tmp_path))
+    calls = []
+    started = threading.Barrier(4)
+
+    def render():
+        calls.append(1)
+        return b'audio'
+
+    def worker():
+        started.wait()
+        store.get_or_render(key(1), render)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+
+def test_evict_drops_oldest_renders(tmp_path):
+    store = AudioStore(str(tmp_path), max_bytes=250)
+    for n in range(3):
+        store.put(key(n), b'x' * 100)
+    # 300 bytes > 250: evicted down to 90% of the budget
+    assert not store.exists(key(0))
+    assert store.exists(key(1)) and store.exists(key(2))
+    assert store.stats()['bytes'] == 200
+    assert AudioStore(str(tmp_path), max_bytes=250).stats()['bytes'] == 200
+
+def test_evict_leaves_lock_files(tmp_path):
+    store = AudioStore(str(tmp_path), max_bytes=150)
+    store.get_or_render(key(0), lambda: b'x' * 100)
+    lock_file = os.path.dirname(store.path(key(0))) + '.lock'
+    assert os.path.exists(lock_file)
+
+    store.put(key(1), b'x' * 100)
+    assert not store.exists(key(0))
+    # Another process may be blocked on it; unlinking would split the lock
+    assert os.path.exists(lock_file)
+
+def test_budget_counts_every_process(tmp_path):
+    # Two stores on one root stand in for two worker processes
+    first = AudioStore(str(tmp_path), max_bytes=250)
+    second = AudioStore(str(tmp_path), max_bytes=250)
+    # Both read the (still empty) index before either writes
+    first.stats()
+    second.stats()
+    first.put(key(0), b'x' * 100)
+    second.put(key(1), b'x' * 100)
+    assert first.stats()['bytes'] == 200
+
+    first.put(key(2), b'x' * 100)
+    assert not second.exists(key(0))
+    assert second.stats() == {'entries': 2, 'bytes': 200, 'max_bytes': 250}
+
+def test_index_ignores_torn_last_line(tmp_path):
+    store = AudioStore(str(tmp_path))
+    store.put(key(0), b'x' * 100)
+    with open(store.index_file, 'ab') as f:
+        f.write(b'{"key": "torn", "si')
+    assert AudioStore(str(tmp_path)).stats()['entries'] == 1
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+from server.utils.codecs import (
+    DecodeError, decode_document, decode_header, decode_journal_record, decode_log, decode_users,
+    encode_document, encode_header, encode_journal_record, encode_log_records, encode_users, validate_user
+)
+
+USER = {
+    'id': 'ann',
+    'username': 'Ann',
+    'email': 'ann@example.com',
+    'password_hash': 'hash',
+    'nativeLanguage': 'English',
+    'learningLanguage': 'German',
+    'created_at': '2024-01-01T00:00:00',
+    'personalization': {'hobbies': ['Schach', 'Musik'], 'job': 'Ärztin'}
+}
+
+def message(index, sender='user', **fields):
+    return {
+        'id': f'{sender}-{index}-1717000000',
+        'content': f'Nachricht {index} – grüß dich! 你好',
+        'sender': sender,
+        'timestamp': '2024-06-01T10:00:00.123456',
+        'intent': 'chat',
+        'audio_language': 'German',
+        **fields
+    }
+
+CONVERSATION = {
+    'id': 'c1',
+    'user_id': 'ann',
+    'created_at': '2024-06-01T09:59:00',
+    'summary': '- Spielt Schach',
+    'current_topic': 'Hobbys',
+    'user_message_count': 1,
+    'messages_since_summary': 2,
+    'summary_mark': 0
+}
+
+
+# ---- users ----
+
+def test_users_round_trip():
+    users = {'ann': USER, 'bob': dict(USER, id='bob', email='bob@example.com')}
+    assert decode_users(encode_users(users)) == users
+
+def test_users_snapshot_keeps_unknown_fields_and_reads_stdlib_json():
+    users = {'ann': dict(USER, streak_days=12)}
+    assert decode_users(json.dumps(users).encode('utf-8')) == users
+    assert decode_users(encode_users(users))['ann']['streak_days'] == 12
+
+def test_users_snapshot_is_pretty_printed():
+    assert encode_users({'ann': USER}).count(b'\n') > len(USER)
+
+def test_validate_user():
+    validate_user(USER)
+    validate_user({key: value for key, value in USER.items() if key != 'personalization'})
+    with pytest.raises(DecodeError):
+        validate_user({key: value for key, value in USER.items() if key != 'email'})
+    with pytest.raises(DecodeError):
+        validate_user(dict(USER, created_at=20240101))
+
+@pytest.mark.parametrize('record', [
+    {'op': 'put', 'id': 'ann', 'data': USER},
+    {'op': 'update', 'id': 'ann', 'data': {'username': 'Anna'}},
+    {'op': 'delete', 'id': 'ann'},
+    {'op': 'reset', 'data': {'ann': USER}}
+])
+def test_journal_record_round_trip(record):
+    line = encode_journal_record(record)
+    assert line.endswith(b'\n') and line.count(b'\n') == 1
+    decoded = decode_journal_record(line)
+    assert (decoded.op, decoded.id, decoded.data) == (record['op'], record.get('id'), record.get('data'))
+
+def test_journal_record_rejects_bad_lines():
+    with pytest.raises(DecodeError):
+        decode_journal_record(b'{"op": "put", "id": 7}')
+    with pytest.raises(DecodeError):
+        decode_journal_record(b'{"op": "put", "id": "an')
+
+
+# ---- conversations ----
+
+def test_header_round_trip():
+    header = {
+        'user_id': 'ann',
+        'current_conversation_id': 'c1',
+        'conversations': [CONVERSATION, {'id': 'c0', 'user_id': 'ann', 'created_at': '2024-05-01T00:00:00', 'summary': ''}],
+        'message_counts': {'c1': 2, 'c0': 0}
+    }
+    assert decode_header(encode_header(header)) == header
+
+def test_header_drops_unset_optional_fields():
+    header = {
+        'user_id': 'ann',
+        'current_conversation_id': None,
+        'conversations': [{'id': 'c1', 'user_id': 'ann', 'created_at': '2024-06-01T09:59:00'}],
+        'message_counts': {}
+    }
+    conv = decode_header(encode_header(header))['conversations'][0]
+    assert conv == {'id': 'c1', 'user_id': 'ann', 'created_at': '2024-06-01T09:59:00', 'summary': ''}
+
+def test_document_round_trip():
+    document = {
+        'user_id': 'ann',
+        'conversations': [dict(CONVERSATION, messages=[message(0), message(1, 'bot')])],
+        'current_conversation_id': 'c1'
+    }
+    assert decode_document(encode_document(document)) == document
+
+def test_document_message_optional_fields_default_to_none():
+    legacy = {
+        'user_id': 'ann',
+        'conversations': [{
+            'id': 'c1', 'user_id': 'ann', 'created_at': '2024-06-01T09:59:00', 'summary': '',
+            'messages': [{'id': 'user-0-1', 'content': 'hallo', 'sender': 'user', 'timestamp': '2024-06-01T10:00:00'}]
+        }]
+    }
+    decoded = decode_document(json.dumps(legacy).encode('utf-8'))
+    assert decoded['current_conversation_id'] is None
+    msg = decoded['conversations'][0]['messages'][0]
+    assert msg['content'] == 'hallo' and msg['intent'] is None and msg['audio_language'] is None
+
+def test_log_round_trip():
+    records = encode_log_records('c1', [message(0), message(1, 'bot')]) + encode_log_records('c2', [message(0)])
+    assert decode_log(records) == [('c1', message(0)), ('c1', message(1, 'bot')), ('c2', message(0))]
+
+def test_log_skips_torn_and_invalid_lines():
+    good = encode_log_records('c1', [message(0), message(1, 'bot')])
+    invalid = b'{"conversation_id": "c1", "message": {"id": "x"}}\n'
+    torn = encode_log_records('c1', [message(2)])[:40]
+    assert decode_log(torn + b'\n' + invalid + good + torn) == [
+        ('c1', message(0)), ('c1', message(1, 'bot'))
+    ]
+
+def test_empty_log():
+    assert decode_log(b'') == []
+    assert encode_log_records('c1', []) == b''
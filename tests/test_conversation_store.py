@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+
+import pytest
+from flask import current_app
+
+from server.utils import conversation_utils
+from server.utils.conversation_utils import (
+    ConversationCache, add_message_to_conversation, get_current_conversation, get_user_conversation_header_file,
+    get_user_conversation_log_file, get_user_conversations_file, load_user_conversations,
+    save_user_conversations, start_new_conversation
+)
+
+
+def message(content, sender='user', timestamp='2024-01-01T10:00:00'):
+    return {'content': content, 'sender': sender, 'timestamp': timestamp}
+
+def add(user_id, content, sender='user', timestamp='2024-01-01T10:00:00'):
+    conversations_data = load_user_conversations(user_id)
+    add_message_to_conversation(conversations_data, message(content, sender, timestamp))
+    save_user_conversations(user_id, conversations_data)
+
+def contents(conversations_data):
+    return [msg['content'] for msg in get_current_conversation(conversations_data)['messages']]
+
+def log_lines(user_id):
+    with open(get_user_conversation_log_file(user_id), 'rb') as f:
+        return f.read().splitlines()
+
+
+def test_new_user_has_no_conversations(app):
+    assert load_user_conversations('ann') == {'user_id': 'ann', 'conversations': [], 'current_conversation_id': None}
+
+def test_messages_are_appended_to_the_log(app):
+    add('ann', 'hallo')
+    add('ann', 'hi', 'bot')
+    add('ann', 'wie geht es?')
+    assert len(log_lines('ann')) == 3
+    assert contents(load_user_conversations('ann')) == ['hallo', 'hi', 'wie geht es?']
+
+def test_header_behind_log_trusts_the_log(app):
+    add('ann', 'hallo')
+    with open(get_user_conversation_header_file('ann'), 'rb') as f:
+        stale_header = f.read()
+    add('ann', 'noch da')
+    # Crash between appending to the log and rewriting the header
+    with open(get_user_conversation_header_file('ann'), 'wb') as f:
+        f.write(stale_header)
+    assert contents(load_user_conversations('ann')) == ['hallo', 'noch da']
+    add('ann', 'danach')
+    assert len(log_lines('ann')) == 3
+
+def test_corrupt_header_is_rebuilt_from_log(app):
+    add('ann', 'hallo', timestamp='2024-01-01T10:00:00')
+    add('ann', 'hi', 'bot', timestamp='2024-01-01T10:00:01')
+    first_id = load_user_conversations('ann')['current_conversation_id']
+    start_new_conversation('ann')
+    add('ann', 'neues Thema', timestamp='2024-01-02T09:00:00')
+    second_id = load_user_conversations('ann')['current_conversation_id']
+
+    with open(get_user_conversation_header_file('ann'), 'wb') as f:
+        f.write(b'{"user_id": "ann", "conversa')
+
+    conversations_data = load_user_conversations('ann')
+    assert [conv['id'] for conv in conversations_data['conversations']] == [first_id, second_id]
+    assert conversations_data['current_conversation_id'] == second_id
+    assert conversations_data['conversations'][0]['created_at'] == '2024-01-01T10:00:00'
+    assert contents(conversations_data) == ['neues Thema']
+
+    # Written back, and the next turn appends without duplicating the log
+    with open(get_user_conversation_header_file('ann'), 'rb') as f:
+        assert json.load(f)['message_counts'] == {first_id: 2, second_id: 1}
+    add('ann', 'weiter', timestamp='2024-01-02T09:00:05')
+    assert len(log_lines('ann')) == 4
+    assert contents(load_user_conversations('ann')) == ['neues Thema', 'weiter']
+
+def test_corrupt_header_without_log(app):
+    with open(get_user_conversation_header_file('ann'), 'wb') as f:
+        f.write(b'not json')
+    assert load_user_conversations('ann')['conversations'] == []
+
+def test_legacy_document_is_migrated_on_load(app):
+    legacy = {
+        'user_id': 'ann',
+        'current_conversation_id': 'c1',
+        'conversations': [{
+            'id': 'c1', 'user_id': 'ann', 'created_at': '2024-01-01T10:00:00', 'summary': 'Begrüßung',
+            'messages': [dict(message('hallo'), id='user-0-1'), dict(message('hi', 'bot'), id='bot-1-1')]
+        }]
+    }
+    legacy_file = get_user_conversations_file('ann')
+    with open(legacy_file, 'w') as f:
+        json.dump(legacy, f)
+
+    conversations_data = load_user_conversations('ann')
+    assert contents(conversations_data) == ['hallo', 'hi']
+    assert conversations_data['conversations'][0]['summary'] == 'Begrüßung'
+    assert not os.path.exists(legacy_file)
+    assert os.path.exists(legacy_file + conversation_utils.MIGRATED_SUFFIX)
+    assert len(log_lines('ann')) == 2
+
+def test_dropped_conversations_rewrite_the_log(app):
+    for i in range(7):
+        start_new_conversation('ann')
+        add('ann', f'gespräch {i}', timestamp=f'2024-01-0{i + 1}T10:00:00')
+    conversations_data = load_user_conversations('ann')
+    assert len(conversations_data['conversations']) <= 6
+    kept = {conv['id'] for conv in conversations_data['conversations']}
+    assert {json.loads(line)['conversation_id'] for line in log_lines('ann')} <= kept
+
+
+# ---- write-behind cache ----
+
+@pytest.fixture
+def write_behind(app, monkeypatch):
+    app.config['CONVERSATION_CACHE_MAX_BYTES'] = 1024 * 1024
+    # Flushed only when the test says so
+    cache = ConversationCache(1024 * 1024, write_behind=True, flush_interval_ms=3600 * 1000)
+    monkeypatch.setattr(conversation_utils, '_conversation_cache', cache)
+    yield cache
+    cache.close()
+
+def disk_contents(user_id):
+    return [json.loads(line)['message']['content'] for line in log_lines(user_id)]
+
+def test_write_behind_defers_writes_until_flush(write_behind):
+    add('ann', 'hallo')
+    add('ann', 'wie geht es?')
+    assert not os.path.exists(get_user_conversation_log_file('ann'))
+    assert contents(load_user_conversations('ann')) == ['hallo', 'wie geht es?']
+    write_behind.flush()
+    assert disk_contents('ann') == ['hallo', 'wie geht es?']
+    assert write_behind.stats()['dirty'] == 0
+
+def test_reader_miss_does_not_replace_unflushed_turn(write_behind, monkeypatch):
+    add('ann', 'first')
+    write_behind.flush()
+    write_behind.discard(conversation_utils._get_user_lock_path('ann'))
+
+    # A reader misses the cache and reads the disk; before it caches what
+    # it read, a turn is saved (dirty, not yet flushed)
+    read_disk = conversation_utils._load_conversations_from_disk
+    disk_read = threading.Event()
+    turn_saved = threading.Event()
+
+    def slow_read(user_id):
+        conversations_data = read_disk(user_id)
+        disk_read.set()
+        turn_saved.wait(5)
+        return conversations_data
+
+    monkeypatch.setattr(conversation_utils, '_load_conversations_from_disk', slow_read)
+    app = current_app._get_current_object()
+    read = {}
+
+    def reader():
+        with app.app_context():
+            read['data'] = load_user_conversations('ann')
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    assert disk_read.wait(5)
+    monkeypatch.setattr(conversation_utils, '_load_conversations_from_disk', read_disk)
+    add('ann', 'second')
+    turn_saved.set()
+    thread.join(5)
+
+    # The reader gets the newer cached document, and the turn is kept
+    assert contents(read['data']) == ['first', 'second']
+    assert contents(load_user_conversations('ann')) == ['first', 'second']
+    write_behind.flush()
+    assert disk_contents('ann') == ['first', 'second']
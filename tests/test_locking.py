@@ -0,0 +1,155 @@
+import fcntl
+import multiprocessing
+import os
+import threading
+
+import pytest
+from flask import Flask
+
+from server.utils.conversation_utils import (
+    add_message_to_conversation, load_user_conversations, save_user_conversations, user_conversations_lock
+)
+from server.utils.file_utils import UserRepository, add_user, update_user
+from server.utils.lock_utils import StripedLock, atomic_write, interprocess_lock
+
+# Children inherit the imported modules and the test's temp dir
+fork = multiprocessing.get_context('fork')
+
+
+def try_flock(path, shared, result):
+    with open(f'{path}.lock', 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+            result.put(True)
+        except BlockingIOError:
+            result.put(False)
+
+def lock_available_to_other_process(path, shared=False):
+    result = fork.Queue()
+    process = fork.Process(target=try_flock, args=(path, shared, result))
+    process.start()
+    process.join(10)
+    return result.get(timeout=1)
+
+
+def test_exclusive_lock_excludes_other_processes(tmp_path):
+    path = str(tmp_path / 'store')
+    with interprocess_lock(path):
+        assert not lock_available_to_other_process(path, shared=True)
+        assert not lock_available_to_other_process(path)
+    assert lock_available_to_other_process(path)
+
+def test_shared_locks_admit_readers_only(tmp_path):
+    path = str(tmp_path / 'store')
+    with interprocess_lock(path, shared=True):
+        assert lock_available_to_other_process(path, shared=True)
+        assert not lock_available_to_other_process(path)
+
+def test_lock_is_reentrant_per_thread(tmp_path):
+    path = str(tmp_path / 'store')
+    with interprocess_lock(path):
+        with interprocess_lock(path):
+            with interprocess_lock(path, shared=True):
+                pass
+        # Still held after the nested calls return
+        assert not lock_available_to_other_process(path)
+
+def test_exclusive_lock_excludes_other_threads(tmp_path):
+    path = str(tmp_path / 'store')
+    acquired = threading.Event()
+
+    def other():
+        with interprocess_lock(path):
+            acquired.set()
+
+    with interprocess_lock(path):
+        thread = threading.Thread(target=other)
+        thread.start()
+        assert not acquired.wait(0.2)
+    assert acquired.wait(5)
+    thread.join()
+
+def test_striped_lock_maps_a_key_to_one_reentrant_lock():
+    locks = StripedLock(16)
+    assert locks.get('ann') is locks.get('ann')
+    with locks.get('ann'):
+        with locks.get('ann'):
+            pass
+
+def test_atomic_write(tmp_path):
+    path = str(tmp_path / 'data.json')
+    atomic_write(path, '{"a": 1}')
+    atomic_write(path, b'{"a": 2}')
+    with open(path, 'rb') as f:
+        assert f.read() == b'{"a": 2}'
+    assert os.listdir(tmp_path) == ['data.json']
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path, monkeypatch):
+    path = str(tmp_path / 'data.json')
+    atomic_write(path, b'old')
+
+    def fail(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(os, 'replace', fail)
+    with pytest.raises(OSError):
+        atomic_write(path, b'new')
+    with open(path, 'rb') as f:
+        assert f.read() == b'old'
+    assert os.listdir(tmp_path) == ['data.json']
+
+
+# ---- the stores under several worker processes ----
+
+PROCESSES = 4
+OPERATIONS = 15
+
+def make_app(data_dir):
+    app = Flask('tests')
+    app.config.update(
+        DATA_DIR=data_dir,
+        USERS_FILE=os.path.join(data_dir, 'users.json'),
+        USERS_JOURNAL_ENABLED=True,
+        USERS_JOURNAL_COMPACT_THRESHOLD=10,
+        CONVERSATION_CACHE_MAX_BYTES=0
+    )
+    return app
+
+def make_user(user_id):
+    return {
+        'id': user_id, 'username': user_id, 'email': f'{user_id}@example.com', 'password_hash': 'hash',
+        'nativeLanguage': 'English', 'learningLanguage': 'German', 'created_at': '2024-01-01T00:00:00'
+    }
+
+def write_from_process(data_dir, process_index):
+    with make_app(data_dir).app_context():
+        for i in range(OPERATIONS):
+            add_user(f'p{process_index}-{i}', make_user(f'p{process_index}-{i}'))
+            update_user('shared', {f'p{process_index}': i})
+            with user_conversations_lock('shared'):
+                conversations_data = load_user_conversations('shared')
+                add_message_to_conversation(conversations_data, {
+                    'content': f'p{process_index}-{i}', 'sender': 'user', 'timestamp': '2024-01-01T10:00:00'
+                })
+                save_user_conversations('shared', conversations_data)
+
+def test_stores_under_concurrent_processes(tmp_path):
+    data_dir = str(tmp_path)
+    with make_app(data_dir).app_context():
+        add_user('shared', make_user('shared'))
+
+    processes = [fork.Process(target=write_from_process, args=(data_dir, p)) for p in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    users = UserRepository(os.path.join(data_dir, 'users.json'), journal=True).all()
+    assert len(users) == PROCESSES * OPERATIONS + 1
+    assert all(users['shared'][f'p{p}'] == OPERATIONS - 1 for p in range(PROCESSES))
+
+    with make_app(data_dir).app_context():
+        conversations_data = load_user_conversations('shared')
+    contents = [msg['content'] for conv in conversations_data['conversations'] for msg in conv['messages']]
+    assert sorted(contents) == sorted(f'p{p}-{i}' for p in range(PROCESSES) for i in range(OPERATIONS))
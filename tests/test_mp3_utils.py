@@ -0,0 +1,52 @@
+from server.utils.mp3_utils import _frame_length, concat_mp3, strip_metadata
+
+# MPEG-2 Layer III, 32 kbps, 16 kHz, no padding: 144-byte frames
+HEADER = bytes([0xFF, 0xF3, 0x48, 0xC4])
+
+
+def frame(payload=b''):
+    return HEADER + payload.ljust(140, b'\0')[:140]
+
+def id3v2(body=b'TIT2xxxxx'):
+    size = len(body)
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b'ID3\x03\x00\x00' + syncsafe + body
+
+def id3v1():
+    return b'TAG' + b'\0' * 125
+
+def xing_frame(tag=b'Xing'):
+    return frame(b'\0' * 13 + tag)
+
+
+def test_frame_length():
+    assert _frame_length(HEADER) == 144
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, padded
+    assert _frame_length(bytes([0xFF, 0xFB, 0x92, 0x64])) == 418
+    assert _frame_length(b'ID3\x03') is None
+    assert _frame_length(HEADER[:3]) is None
+
+def test_strip_metadata_removes_tags_and_info_frame():
+    audio = frame(b'a') + frame(b'b')
+    assert strip_metadata(id3v2() + xing_frame(b'Info') + audio + id3v1()) == audio
+
+def test_strip_metadata_keeps_plain_frames():
+    audio = frame(b'a') + frame(b'b')
+    assert strip_metadata(audio) == audio
+
+def test_strip_metadata_with_id3_footer():
+    tag = bytearray(id3v2())
+    tag[5] |= 0x10
+    audio = frame(b'a')
+    assert strip_metadata(bytes(tag) + b'3DI' + b'\0' * 7 + audio) == audio
+
+def test_concat_mp3_joins_frames_only():
+    first = id3v2() + xing_frame() + frame(b'one')
+    second = id3v2(b'TIT2yy') + xing_frame(b'Info') + frame(b'two') + frame(b'three') + id3v1()
+    joined = concat_mp3([first, second])
+    assert joined == frame(b'one') + frame(b'two') + frame(b'three')
+    assert len(joined) % 144 == 0
+    assert b'Xing' not in joined and b'Info' not in joined and b'ID3' not in joined
+
+def test_concat_mp3_single_render():
+    assert concat_mp3([frame(b'x')]) == frame(b'x')
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from server.services.speech_pipeline import SpeechPipeline, split_sentences
+
+
+def test_split_sentences_latin():
+    text = 'Hallo Anna! Wie geht es dir heute? Ich habe heute Pizza gegessen.'
+    assert split_sentences(text) == [
+        'Hallo Anna! Wie geht es dir heute?',
+        'Ich habe heute Pizza gegessen.'
+    ]
+
+def test_split_sentences_merges_short_fragments():
+    assert split_sentences('Ja. Oh! Das ist wirklich toll.') == ['Ja. Oh! Das ist wirklich toll.']
+
+def test_split_sentences_keeps_decimals_together():
+    assert split_sentences('Es kostet 3.50 Euro.', min_chars=1) == ['Es kostet 3.50 Euro.']
+
+def test_split_sentences_closing_quotes():
+    text = 'Er sagte: "Das ist gut." Dann ging er nach Hause.'
+    assert split_sentences(text, min_chars=1) == ['Er sagte: "Das ist gut.', 'Dann ging er nach Hause.']
+
+def test_split_sentences_cjk_without_spaces():
+    text = '你好！你今天过得怎么样？我们聊聊你的爱好吧。你喜欢音乐吗？'
+    assert split_sentences(text, min_chars=4) == [
+        '你好！你今天过得怎么样？',
+        '我们聊聊你的爱好吧。',
+        '你喜欢音乐吗？'
+    ]
+
+def test_split_sentences_japanese_closing_bracket():
+    assert split_sentences('「元気ですか？」はい、元気です。', min_chars=1) == ['「元気ですか？', 'はい、元気です。']
+
+def test_split_sentences_danda_and_arabic_question_mark():
+    assert split_sentences('नमस्ते। आप कैसे हैं?', min_chars=1) == ['नमस्ते।', 'आप कैसे हैं?']
+    assert split_sentences('مرحبا؟ كيف حالك؟', min_chars=1) == ['مرحبا؟', 'كيف حالك؟']
+
+def test_split_sentences_no_end_mark():
+    assert split_sentences('kein Satzende') == ['kein Satzende']
+    assert split_sentences('   ') == []
+
+def _stream(chunks):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pipeline = SpeechPipeline(lambda sentence: sentence, executor)
+        for chunk in chunks:
+            pipeline.feed(chunk)
+        return [chunk['text'] for chunk in pipeline.finish()]
+
+def test_pipeline_matches_split_sentences():
+    text = 'Hallo Anna! Wie geht es dir heute? Ich habe heute Pizza gegessen.'
+    assert _stream([text[i:i + 5] for i in range(0, len(text), 5)]) == split_sentences(text)
+
+def test_pipeline_waits_for_text_after_cjk_mark():
+    # A chunk ending at 。 must not be cut before the next chunk shows
+    # whether a closing bracket follows
+    chunks = ['「今日はとてもいい天気ですね。', '」明日も晴れるといいですね。']
+    assert _stream(chunks) == ['「今日はとてもいい天気ですね。', '明日も晴れるといいですね。']
@@ -0,0 +1,72 @@
+import io
+import wave
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from server.utils.time_stretch import read_wav, stretch_wav, write_wav, wsola
+
+SAMPLE_RATE = 16000
+
+
+def tone(frequency, seconds, sample_rate=SAMPLE_RATE):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (8000 * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+def dominant_frequency(samples, sample_rate=SAMPLE_RATE):
+    # Skip the edges, where the first and last frames fade in and out
+    samples = samples[len(samples) // 10:-len(samples) // 10].astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.argmax(spectrum) * sample_rate / len(samples)
+
+
+@pytest.mark.parametrize('speed', [0.5, 0.8, 1.2, 1.5, 2.0])
+def test_wsola_output_length(speed):
+    samples = tone(220, 2.0)
+    assert len(wsola(samples, SAMPLE_RATE, speed)) == round(len(samples) / speed)
+
+@pytest.mark.parametrize('speed', [0.6, 1.4])
+@pytest.mark.parametrize('frequency', [150, 440])
+def test_wsola_keeps_pitch(speed, frequency):
+    stretched = wsola(tone(frequency, 2.0), SAMPLE_RATE, speed)
+    assert dominant_frequency(stretched) == pytest.approx(frequency, rel=0.02)
+
+def test_wsola_keeps_level():
+    samples = tone(220, 2.0)
+    stretched = wsola(samples, SAMPLE_RATE, 0.7)
+    rms = lambda x: np.sqrt(np.mean(x[len(x) // 10:-len(x) // 10].astype(np.float64) ** 2))
+    assert rms(stretched) == pytest.approx(rms(samples), rel=0.1)
+
+def test_wsola_identity_and_empty():
+    samples = tone(220, 0.5)
+    assert wsola(samples, SAMPLE_RATE, 1.0) is samples
+    assert len(wsola(np.zeros(0, dtype=np.int16), SAMPLE_RATE, 0.5)) == 0
+
+def test_stretch_wav_round_trip():
+    data = write_wav(tone(220, 1.0), SAMPLE_RATE)
+    samples, sample_rate = read_wav(stretch_wav(data, 0.5))
+    assert sample_rate == SAMPLE_RATE
+    assert len(samples) == 2 * SAMPLE_RATE
+
+def test_stretch_wav_to_mp3_matches_the_tts_renders():
+    pytest.importorskip('lameenc')
+    from server.utils.mp3_utils import _frame_length
+    from server.utils.time_stretch import stretch_wav_to_mp3
+
+    mp3 = stretch_wav_to_mp3(write_wav(tone(220, 1.0), SAMPLE_RATE), 0.5)
+    # MPEG-2 Layer III, 32 kbps, 16 kHz: stitchable with the Azure MP3 renders
+    assert _frame_length(mp3[:4]) == 72 * 32000 // 16000 + ((mp3[2] >> 1) & 1)
+    assert (mp3[1] >> 3) & 0x03 == 2
+    # Two seconds at 32 kbps, not 256 kbps WAV
+    assert len(mp3) < 2 * 32000 // 8 * 1.2
+
+def test_read_wav_rejects_stereo():
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(b'\0' * 400)
+    with pytest.raises(ValueError):
+        read_wav(buffer.getvalue())
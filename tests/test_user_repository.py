@@ -0,0 +1,186 @@
+import json
+
+import pytest
+
+from server.utils import file_utils
+from server.utils.file_utils import UserRepository
+
+
+def user(user_id, email=None, **fields):
+    return {
+        'id': user_id,
+        'username': user_id.title(),
+        'email': email or f'{user_id}@example.com',
+        'password_hash': 'hash',
+        'nativeLanguage': 'English',
+        'learningLanguage': 'German',
+        'created_at': '2024-01-01T00:00:00',
+        'personalization': {},
+        **fields
+    }
+
+@pytest.fixture
+def users_file(tmp_path):
+    return str(tmp_path / 'users.json')
+
+@pytest.fixture
+def no_mtime_cache(monkeypatch):
+    # Re-check the file on every read instead of once a second
+    monkeypatch.setattr(file_utils, 'MTIME_CHECK_INTERVAL', 0)
+
+
+def test_find_by_id_and_email(users_file):
+    repository = UserRepository(users_file)
+    assert repository.add('ann', user('ann'))
+    assert repository.add('bob', user('bob'))
+    assert repository.find_by_id('ann')['username'] == 'Ann'
+    assert repository.find_by_email('bob@example.com') == ('bob', user('bob'))
+    assert repository.find_by_id('nobody') is None
+    assert repository.find_by_email('nobody@example.com') == (None, None)
+
+def test_add_rejects_taken_id_email_and_invalid_records(users_file):
+    repository = UserRepository(users_file)
+    assert repository.add('ann', user('ann'))
+    assert not repository.add('ann', user('ann', email='other@example.com'))
+    assert not repository.add('ann2', user('ann2', email='ann@example.com'))
+    assert not repository.add('broken', {'id': 'broken'})
+    assert set(repository.all()) == {'ann'}
+
+def test_update_moves_email_index(users_file):
+    repository = UserRepository(users_file)
+    repository.add('ann', user('ann'))
+    assert repository.update('ann', {'email': 'anna@example.com'})
+    assert repository.find_by_email('ann@example.com') == (None, None)
+    assert repository.find_by_email('anna@example.com')[0] == 'ann'
+    assert not repository.update('nobody', {'email': 'x@example.com'})
+
+def test_delete_drops_indexes(users_file):
+    repository = UserRepository(users_file)
+    repository.add('ann', user('ann'))
+    assert repository.delete('ann')
+    assert repository.find_by_id('ann') is None
+    assert repository.find_by_email('ann@example.com') == (None, None)
+    assert not repository.delete('ann')
+    # The email is free again
+    assert repository.add('ann2', user('ann2', email='ann@example.com'))
+
+def test_results_are_copies(users_file):
+    repository = UserRepository(users_file)
+    repository.add('ann', user('ann'))
+    repository.find_by_id('ann')['personalization']['hobby'] = 'chess'
+    repository.all()['ann']['username'] = 'Mallory'
+    assert repository.find_by_id('ann') == user('ann')
+
+def test_find_by_email_after_concurrent_removal(users_file):
+    repository = UserRepository(users_file)
+    repository.add('ann', user('ann'))
+    # A reload or delete between the index lookup and the record lookup
+    del repository._users['ann']
+    assert repository.find_by_email('ann@example.com') == (None, None)
+
+def test_writes_persist_across_instances(users_file):
+    UserRepository(users_file).add('ann', user('ann'))
+    with open(users_file) as f:
+        assert json.load(f) == {'ann': user('ann')}
+    assert UserRepository(users_file).find_by_email('ann@example.com')[0] == 'ann'
+
+def test_external_edit_invalidates_memory(users_file, no_mtime_cache):
+    repository = UserRepository(users_file)
+    repository.add('ann', user('ann'))
+    with open(users_file, 'w') as f:
+        json.dump({'bob': user('bob')}, f)
+    assert repository.find_by_id('ann') is None
+    assert repository.find_by_email('bob@example.com')[0] == 'bob'
+
+def test_edit_by_another_process_is_seen(users_file, no_mtime_cache):
+    first = UserRepository(users_file)
+    second = UserRepository(users_file)
+    first.add('ann', user('ann'))
+    assert second.find_by_id('ann') is not None
+    second.update('ann', {'username': 'Anna'})
+    assert first.find_by_id('ann')['username'] == 'Anna'
+
+def test_reads_are_cached_between_checks(users_file, monkeypatch):
+    monkeypatch.setattr(file_utils, 'MTIME_CHECK_INTERVAL', 3600)
+    repository = UserRepository(users_file)
+    repository.add('ann', user('ann'))
+    with open(users_file, 'w') as f:
+        json.dump({}, f)
+    assert repository.find_by_id('ann') is not None
+
+def test_corrupt_file_reads_as_empty(users_file):
+    with open(users_file, 'w') as f:
+        f.write('{not json')
+    assert UserRepository(users_file).all() == {}
+
+
+# ---- journal ----
+
+def read_journal(users_file):
+    try:
+        with open(f'{users_file}.journal') as f:
+            return [json.loads(line) for line in f]
+    except FileNotFoundError:
+        return []
+
+def test_journal_appends_instead_of_rewriting(users_file):
+    repository = UserRepository(users_file, journal=True)
+    repository.add('ann', user('ann'))
+    repository.update('ann', {'username': 'Anna'})
+    repository.delete('ann')
+    assert [record['op'] for record in read_journal(users_file)] == ['put', 'update', 'delete']
+
+def test_journal_is_replayed_on_load(users_file):
+    repository = UserRepository(users_file, journal=True)
+    repository.add('ann', user('ann'))
+    repository.add('bob', user('bob'))
+    repository.update('ann', {'username': 'Anna'})
+    repository.delete('bob')
+    reloaded = UserRepository(users_file, journal=True)
+    assert reloaded.all() == {'ann': user('ann', username='Anna')}
+
+def test_torn_journal_line_is_skipped(users_file):
+    UserRepository(users_file, journal=True).add('ann', user('ann'))
+    with open(f'{users_file}.journal', 'ab') as f:
+        f.write(b'{"op": "delete", "id": "an')
+    assert set(UserRepository(users_file, journal=True).all()) == {'ann'}
+
+def test_compact_folds_journal_into_snapshot(users_file):
+    repository = UserRepository(users_file, journal=True)
+    repository.add('ann', user('ann'))
+    repository.update('ann', {'username': 'Anna'})
+    repository.compact()
+    assert read_journal(users_file) == []
+    with open(users_file) as f:
+        assert json.load(f) == {'ann': user('ann', username='Anna')}
+    repository.add('bob', user('bob'))
+    assert set(UserRepository(users_file, journal=True).all()) == {'ann', 'bob'}
+
+def test_compaction_starts_at_threshold(users_file, monkeypatch):
+    started = []
+    monkeypatch.setattr(UserRepository, '_start_compaction', lambda self: started.append(True))
+    repository = UserRepository(users_file, journal=True, compact_threshold=3)
+    repository.add('ann', user('ann'))
+    repository.add('bob', user('bob'))
+    assert not started
+    repository.add('cid', user('cid'))
+    assert started
+
+def test_turning_journal_off_keeps_journaled_users(users_file):
+    UserRepository(users_file, journal=True).add('ann', user('ann'))
+    assert set(UserRepository(users_file, journal=False).all()) == {'ann'}
+
+def test_switching_journal_mode_off_and_on(users_file):
+    journaled = UserRepository(users_file, journal=True)
+    journaled.add('ann', user('ann'))
+    journaled.update('ann', {'username': 'Old'})
+
+    plain = UserRepository(users_file, journal=False)
+    assert plain.update('ann', {'username': 'New'})
+    assert plain.add('bob', user('bob'))
+    # The leftover journal was folded in, not left to be replayed later
+    assert read_journal(users_file) == []
+
+    journaled_again = UserRepository(users_file, journal=True)
+    assert journaled_again.find_by_id('ann')['username'] == 'New'
+    assert set(journaled_again.all()) == {'ann', 'bob'}